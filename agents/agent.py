@@ -4,13 +4,22 @@ import os
 import json
 import base64
 import asyncio
+import uuid
 import websockets
 from fastapi.websockets import WebSocketDisconnect
 from fastapi import WebSocket
-from tools.functioncalling import book_room_function, get_available_rooms_function, \
-    webscraper_for_recommendations_function, function_to_schema, invoke_function
+from tools.functioncalling import ToolCallState, run_function_calls, serialize_result
+from tools.tools import release_holds
+from agents.calllog import start_call
+from agents.recorder import start_recording
+from agents.context import CONTEXT_COMPACTION_ENABLED, ConversationContext
+from agents.prefetch import AVAILABILITY_PREFETCH_ENABLED, AvailabilityPrefetcher
+from agents.vad import LOCAL_VAD_ENABLED, LOCAL_VAD_BARGE_IN, VoiceActivityDetector
+from agents.greetings import GREETING_CACHE_ENABLED, greeting_cache, greeting_transcript, stream_greeting
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Overridable so load tests can point the bridge at a local fake Realtime server (ws:// allowed)
+OPENAI_REALTIME_URL = os.getenv("OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview")
 active_websocket = set()
 
 
@@ -24,25 +33,45 @@ LOG_EVENT_TYPES = [
 ]
 SHOW_TIMING_MATH = False
 
-async def send_initial_conversation_item(openai_ws,initial_message):
+async def send_initial_conversation_item(openai_ws,initial_message,customer_context=None):
     """Send initial conversation item if AI talks first."""
+    content = []
+    if customer_context:
+        content.append({"type": "input_text", "text": customer_context})
+    content.append({"type": "input_text", "text": initial_message})
     initial_conversation_item = {
         "type": "conversation.item.create",
         "item": {
             "type": "message",
             "role": "user",
-            "content": [
-                {
-                    "type": "input_text",
-                    "text": initial_message
-                }
-            ]
+            "content": content
         }
     }
     await openai_ws.send(json.dumps(initial_conversation_item))
     await openai_ws.send(json.dumps({"type": "response.create"}))
 
-async def initialize_session(openai_ws,system_message,initial_message,tool_schemas= None):
+async def send_greeting_conversation_items(openai_ws,greeting,customer_context=None):
+    """Record the pre-rendered greeting as already said, so the model waits for the caller's answer."""
+    if customer_context:
+        await openai_ws.send(json.dumps({
+            "type": "conversation.item.create",
+            "item": {"type": "message", "role": "user", "content": [{"type": "input_text", "text": customer_context}]}
+        }))
+    await openai_ws.send(json.dumps({
+        "type": "conversation.item.create",
+        "item": {"type": "message", "role": "assistant", "content": [{"type": "text", "text": greeting}]}
+    }))
+
+
+async def render_greetings():
+    """Render the missing greetings of the configured voice (a startup task of main.py)."""
+    try:
+        await greeting_cache.render_missing(VOICE, OPENAI_REALTIME_URL, OPENAI_API_KEY)
+    except Exception as e:
+        print(f"Could not render the greetings: {e}")
+
+
+async def initialize_session(openai_ws,system_message,initial_message,tool_schemas= None,customer_context=None,greeting=None):
     """Control initial session with OpenAI."""
     session_update = {
         "type": "session.update",
@@ -53,6 +82,7 @@ async def initialize_session(openai_ws,system_message,initial_message,tool_schem
             "voice": VOICE,
             "instructions": system_message,
             "modalities": ["text", "audio"],
+            "input_audio_transcription": {"model": "whisper-1"},
             "temperature": 0.8,
             "tools":tool_schemas
         }
@@ -63,25 +93,52 @@ async def initialize_session(openai_ws,system_message,initial_message,tool_schem
     print('Sending session update:', json.dumps(session_update))
     await openai_ws.send(json.dumps(session_update))
 
-    # Uncomment the next line to have the AI speak first
-    await send_initial_conversation_item(openai_ws, initial_message)
-async def handle_call(websocket: WebSocket,system_message,initial_message,tool_schemas= None):
-    """Handle WebSocket connections between Twilio and OpenAI."""
+    if greeting:
+        # The greeting audio is already playing from the cache
+        await send_greeting_conversation_items(openai_ws, greeting, customer_context)
+    else:
+        # Uncomment the next line to have the AI speak first
+        await send_initial_conversation_item(openai_ws, initial_message, customer_context)
+async def handle_call(websocket: WebSocket,system_message,initial_message,tool_schemas= None,customer_context=None,
+                      customer_number=None,direction="inbound"):
+    """Handle WebSocket connections between Twilio and OpenAI.
+
+    customer_context is an optional awaitable (e.g. a task started by the caller)
+    resolving to text that is added to the initial conversation item; it runs
+    while the realtime session is being opened.
+    When the greeting has been rendered (agents.greetings), its audio is streamed
+    from the cache at the start of the media stream, also while the session opens,
+    instead of having the model speak initial_message.
+    The call, its transcript and its tool calls are recorded through agents.calllog,
+    and its audio through agents.recorder when CALL_RECORDING is on.
+    On long calls the conversation is kept under a token budget by agents.context.
+    """
     print("Client connected")
     await websocket.accept()
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
+    call_record = start_call(direction, customer_number)
+    recording = start_recording(call_record.id, direction, customer_number)
+    greeting_audio = greeting_cache.get(VOICE) if GREETING_CACHE_ENABLED else None
+    greeting_task = None
+    if greeting_audio:
+        greeting_task = asyncio.create_task(stream_greeting(websocket, greeting_audio))
+    ssl_context = None
+    if OPENAI_REALTIME_URL.startswith("wss://"):
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
 
     async with websockets.connect(
-            'wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview',
+            OPENAI_REALTIME_URL,
             ssl=ssl_context,
             extra_headers={
                 "Authorization": f"Bearer {OPENAI_API_KEY}",
                 "OpenAI-Beta": "realtime=v1"
             }
     ) as openai_ws:
-        await initialize_session(openai_ws,system_message=system_message,initial_message=initial_message,tool_schemas=tool_schemas)
+        if customer_context is not None:
+            customer_context = await customer_context
+        await initialize_session(openai_ws,system_message=system_message,initial_message=initial_message,tool_schemas=tool_schemas,customer_context=customer_context,
+                                 greeting=greeting_transcript() if greeting_task else None)
         global active_websocket
         active_websocket.add(websocket)
         active_websocket.add(openai_ws)
@@ -91,33 +148,73 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
         last_assistant_item = None
         mark_queue = []
         response_start_timestamp_twilio = None
+        greeting_playing = False
+        # Rooms offered during the call are held under this key until booked, expired or hangup
+        hold_key = str(call_record.id or uuid.uuid4())
+        prefetcher = AvailabilityPrefetcher(hold_key=hold_key) if AVAILABILITY_PREFETCH_ENABLED else None
+        tool_state = ToolCallState(prefetcher=prefetcher, context={"hold_key": hold_key})
+        prefetch_start = asyncio.create_task(prefetcher.start()) if prefetcher is not None else None
+        vad = VoiceActivityDetector() if LOCAL_VAD_ENABLED else None
+        context = ConversationContext() if CONTEXT_COMPACTION_ENABLED else None
+        if greeting_task:
+            # Twilio's start event was consumed while streaming the greeting
+            try:
+                stream_sid = await greeting_task
+            except WebSocketDisconnect:
+                print("Client disconnected before the stream started.")
+                call_record.end("caller_disconnected")
+                if recording is not None:
+                    recording.stop()
+                return
+            print(f"Incoming stream has started {stream_sid}, greeting streamed from the cache")
+            call_record.set_stream(stream_sid)
+            mark_queue.append('greeting')
+            response_start_timestamp_twilio = 0
+            greeting_playing = True
+            if recording is not None:
+                recording.assistant_audio(0, greeting_audio)
 
 
         async def receive_from_twilio():
             """Receive audio data from Twilio and send it to the OpenAI Realtime API."""
-            nonlocal stream_sid, latest_media_timestamp
+            nonlocal stream_sid, latest_media_timestamp, greeting_playing, last_assistant_item, response_start_timestamp_twilio
             try:
                 async for message in websocket.iter_text():
                     data = json.loads(message)
 
                     if data['event'] == 'media' and openai_ws.open:
                         latest_media_timestamp = int(data['media']['timestamp'])
-                        audio_append = {
-                            "type": "input_audio_buffer.append",
-                            "audio": data['media']['payload']
-                        }
-                        await openai_ws.send(json.dumps(audio_append))
+                        if recording is not None:
+                            recording.caller_audio(latest_media_timestamp, data['media']['payload'])
+                        if vad is None:
+                            payloads, speech_started = [data['media']['payload']], False
+                        else:
+                            payloads, speech_started = vad.process(data['media']['payload'])
+                        for payload in payloads:
+                            audio_append = {
+                                "type": "input_audio_buffer.append",
+                                "audio": payload
+                            }
+                            await openai_ws.send(json.dumps(audio_append))
+                        if speech_started and LOCAL_VAD_BARGE_IN and (last_assistant_item or greeting_playing):
+                            # Barge-in detected locally, before server_vad reports it
+                            print("Local VAD detected speech, interrupting.")
+                            await handle_speech_started_event()
                     elif data['event'] == 'start':
                         stream_sid = data['start']['streamSid']
                         print(f"Incoming stream has started {stream_sid}")
+                        call_record.set_stream(stream_sid)
                         response_start_timestamp_twilio = None
                         latest_media_timestamp = 0
                         last_assistant_item = None
                     elif data['event'] == 'mark':
                         if mark_queue:
                             mark_queue.pop(0)
+                        if data.get('mark', {}).get('name') == 'greeting':
+                            greeting_playing = False
             except WebSocketDisconnect:
                 print("Client disconnected.")
+                call_record.outcome = call_record.outcome or "caller_disconnected"
                 if openai_ws.open:
                     await openai_ws.close()
 
@@ -129,37 +226,64 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
                     response = json.loads(openai_message)
                     if response['type'] in LOG_EVENT_TYPES:
                         print(f"Received event: {response['type']}", response)
+                    if context is not None:
+                        context.on_event(response)
 
                     if response.get('type') == 'response.done':
                         # Safely extract the transcript if output is available
                         output = response['response'].get('output', [])
                         if output:
+                            function_calls = []
                             for item in output:
+                                if item.get('type') == 'message':
+                                    for part in item.get('content', []):
+                                        call_record.transcript("assistant", part.get('transcript') or part.get('text'))
+                                        if prefetcher is not None:
+                                            prefetcher.observe(part.get('transcript') or part.get('text'))
                                 if item.get('type') == 'function_call':
-                                    function_name = item.get('name')
-                                    arguments = json.loads(item.get('arguments', "{}"))
-                                    call_id = item.get('call_id')
-
-                                    print(f"Detected function call: {function_name} with arguments: {arguments}")
-                                    result = await invoke_function(function_name, arguments)
-                                    # Send function_call_output to OpenAI
+                                    try:
+                                        arguments = json.loads(item.get('arguments') or "{}")
+                                    except json.JSONDecodeError:
+                                        arguments = item.get('arguments')  # rejected by the tool's validator
+                                    function_calls.append({
+                                        "name": item.get('name'),
+                                        "arguments": arguments,
+                                        "call_id": item.get('call_id'),
+                                    })
+                                    print(f"Detected function call: {item.get('name')} with arguments: {item.get('arguments')}")
+
+                            if function_calls:
+                                # Run the calls of this response together, post every output,
+                                # then ask for a single follow-up response.
+                                results = await run_function_calls(function_calls, tool_state)
+                                for call, result, latency_ms in results:
+                                    call_record.tool_call(call["name"], call["arguments"], result, latency_ms)
+                                    if call["name"] == "hangup_function":
+                                        call_record.outcome = "hangup"
                                     await openai_ws.send(json.dumps({
                                         "type": "conversation.item.create",
                                         "item": {
                                             "type": "function_call_output",
-                                            "call_id": call_id,
-                                            "output": json.dumps(result)
+                                            "call_id": call["call_id"],
+                                            "output": serialize_result(call["name"], result)
                                         }
                                     }))
-                                    await openai_ws.send(json.dumps({"type": "response.create"}))
-
-
-
+                                await openai_ws.send(json.dumps({"type": "response.create"}))
+                            elif context is not None:
+                                # Between turns: nothing is being generated, the conversation can be trimmed
+                                await context.compact(openai_ws)
                         else:
                             print("No output in response.done")
 
+                    if response.get('type') == 'conversation.item.input_audio_transcription.completed':
+                        call_record.transcript("user", response.get('transcript'))
+                        if prefetcher is not None:
+                            prefetcher.observe(response.get('transcript'))
+
                     if response.get('type') == 'response.audio.delta' and 'delta' in response:
                         audio_payload = base64.b64encode(base64.b64decode(response['delta'])).decode('utf-8')
+                        if context is not None:
+                            context.add_audio(response.get('item_id'), len(response['delta']) * 3 // 4)
                         audio_delta = {
                             "event": "media",
                             "streamSid": stream_sid,
@@ -168,6 +292,8 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
                             }
                         }
                         await websocket.send_json(audio_delta)
+                        if recording is not None:
+                            recording.assistant_audio(latest_media_timestamp, audio_payload)
 
                         if response_start_timestamp_twilio is None:
                             response_start_timestamp_twilio = latest_media_timestamp
@@ -183,17 +309,18 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
                     # Trigger an interruption. Your use case might work better using `input_audio_buffer.speech_stopped`, or combining the two.
                     if response.get('type') == 'input_audio_buffer.speech_started':
                         print("Speech started detected.")
-                        if last_assistant_item:
-                            print(f"Interrupting response with id: {last_assistant_item}")
+                        if last_assistant_item or greeting_playing:
+                            print(f"Interrupting response with id: {last_assistant_item or 'greeting'}")
                             await handle_speech_started_event()
 
 
             except Exception as e:
                 print(f"Error in send_to_twilio: {e}")
+                call_record.outcome = call_record.outcome or "error"
 
         async def handle_speech_started_event():
             """Handle interruption when the caller's speech starts."""
-            nonlocal response_start_timestamp_twilio, last_assistant_item
+            nonlocal response_start_timestamp_twilio, last_assistant_item, greeting_playing
             print("Handling speech started event.")
             if mark_queue and response_start_timestamp_twilio is not None:
                 elapsed_time = latest_media_timestamp - response_start_timestamp_twilio
@@ -217,10 +344,14 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
                     "event": "clear",
                     "streamSid": stream_sid
                 })
+                if recording is not None:
+                    recording.cleared(latest_media_timestamp)
 
                 mark_queue.clear()
                 last_assistant_item = None
                 response_start_timestamp_twilio = None
+                greeting_playing = False
+                call_record.event("interruption", data={"audio_end_ms": elapsed_time})
 
         async def send_mark(connection, stream_sid):
             if stream_sid:
@@ -232,4 +363,23 @@ async def handle_call(websocket: WebSocket,system_message,initial_message,tool_s
                 await connection.send_json(mark_event)
                 mark_queue.append('responsePart')
 
-        await asyncio.gather(receive_from_twilio(), send_to_twilio())
\ No newline at end of file
+        try:
+            await asyncio.gather(receive_from_twilio(), send_to_twilio())
+        finally:
+            if vad is not None:
+                print(f"Local VAD: {vad.stats()}")
+                call_record.event("vad", data=vad.stats())
+            try:
+                await asyncio.to_thread(release_holds, hold_key)
+            except Exception as e:
+                print(f"Could not release the room holds of this call (they expire on their own): {e}")
+            if prefetcher is not None:
+                prefetch_start.cancel()
+                prefetcher.close()
+                print(f"Availability prefetch: {prefetcher.stats()}")
+                call_record.event("prefetch", data=prefetcher.stats())
+            if context is not None and context.compactions:
+                call_record.event("context", data=context.stats())
+            call_record.end()
+            if recording is not None:
+                recording.stop()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import math
+
+import numpy as np
+
+# Audio conversion for the media bridge, on whole buffers with NumPy (no per-sample Python).
+# Twilio sends and expects 8 kHz G.711 µ-law; recording, analytics and other speech
+# providers want PCM16, often at 16 or 24 kHz. Decoding is a 256-entry table lookup and
+# encoding a 65536-entry one indexed by the raw PCM16 value, both built at import time.
+TWILIO_RATE = 8000
+ULAW_BIAS = 0x84
+# Encoding works on 14-bit samples, like the G.711 reference code
+ULAW_ENCODE_BIAS = 0x21
+ULAW_ENCODE_CLIP = 8159
+
+
+def _ulaw_decode_table():
+    """PCM16 value of each of the 256 µ-law codes (ITU-T G.711)."""
+    codes = ~np.arange(256, dtype=np.uint8)
+    sign = codes & 0x80
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = ((mantissa.astype(np.int32) << 3) + ULAW_BIAS) << exponent
+    return np.where(sign != 0, ULAW_BIAS - magnitude, magnitude - ULAW_BIAS).astype(np.int16)
+
+
+def _ulaw_encode_table():
+    """µ-law code of every PCM16 value, indexed by the value's uint16 bit pattern (same codes as audioop)."""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2  # 14-bit
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), ULAW_ENCODE_CLIP) + ULAW_ENCODE_BIAS
+    # Segment = how far the highest set bit is above bit 5
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0, 7)
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    codes = ((exponent << 4) | mantissa) ^ mask
+    # Clipped samples fall past the last segment and get the loudest code
+    return np.where(magnitude > 0x1FFF, 0x7F ^ mask, codes).astype(np.uint8)
+
+
+ULAW_TO_PCM = _ulaw_decode_table()
+PCM_TO_ULAW = _ulaw_encode_table()
+
+
+def ulaw_to_pcm(data):
+    """µ-law bytes to an int16 array."""
+    return ULAW_TO_PCM[np.frombuffer(data, dtype=np.uint8)]
+
+
+def pcm_to_ulaw(pcm):
+    """int16 array (or PCM16 little-endian bytes) to µ-law bytes."""
+    if isinstance(pcm, (bytes, bytearray, memoryview)):
+        pcm = np.frombuffer(pcm, dtype="<i2")
+    return PCM_TO_ULAW[np.asarray(pcm, dtype=np.int16).view(np.uint16)].tobytes()
+
+
+def pcm_bytes(pcm):
+    """int16 array to PCM16 little-endian bytes."""
+    return np.asarray(pcm, dtype="<i2").tobytes()
+
+
+def rms_dbfs(pcm):
+    """Level of a PCM16 buffer in dB relative to full scale (-inf clamped to about -90)."""
+    pcm = np.asarray(pcm, dtype=np.float32)
+    rms = math.sqrt(float(np.mean(pcm * pcm))) if pcm.size else 0.0
+    return 20 * math.log10(max(rms, 1.0) / 32768)
+
+
+def zero_crossing_rate(pcm):
+    """Fraction of consecutive samples that change sign."""
+    pcm = np.asarray(pcm)
+    if pcm.size < 2:
+        return 0.0
+    return np.count_nonzero(np.signbit(pcm[1:]) != np.signbit(pcm[:-1])) / (pcm.size - 1)
+
+
+def apply_gain(pcm, gain_db):
+    """PCM16 scaled by gain_db, saturated instead of wrapping around."""
+    scaled = np.asarray(pcm, dtype=np.float32) * (10 ** (gain_db / 20))
+    return np.clip(np.rint(scaled), -32768, 32767).astype(np.int16)
+
+
+def normalize_gain(pcm, target_dbfs=-20.0, max_gain_db=20.0):
+    """PCM16 brought to target_dbfs RMS, never amplified by more than max_gain_db (keeps silence quiet)."""
+    gain_db = min(target_dbfs - rms_dbfs(pcm), max_gain_db)
+    return apply_gain(pcm, gain_db)
+
+
+def _lowpass(up, down, zero_crossings=8):
+    """Windowed-sinc anti-aliasing/anti-imaging filter for an up/down rational resampler."""
+    factor = max(up, down)
+    half = zero_crossings * factor
+    n = np.arange(-half, half + 1)
+    taps = np.sinc(n / factor) * np.hamming(2 * half + 1)
+    return (taps * up / taps.sum()).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming rational resampler (e.g. 8k->16k, 8k->24k, 24k->8k) for PCM16 chunks.
+
+    Keeps the filter history between chunks, so a stream converted frame by frame
+    has no clicks at frame boundaries. Output lags the input by the filter's half
+    length (about 1 ms at 8 kHz).
+    """
+
+    def __init__(self, from_rate, to_rate):
+        divisor = math.gcd(from_rate, to_rate)
+        self.up = to_rate // divisor
+        self.down = from_rate // divisor
+        self.taps = _lowpass(self.up, self.down)
+        self._history_len = -(-len(self.taps) // self.up)
+        self._history = np.zeros(self._history_len, dtype=np.float32)
+        self._consumed = 0
+
+    def process(self, pcm):
+        pcm = np.asarray(pcm, dtype=np.float32)
+        if self.up == self.down:
+            return pcm.astype(np.int16)
+        samples = np.concatenate((self._history, pcm))
+        upsampled = np.zeros(len(samples) * self.up, dtype=np.float32)
+        upsampled[::self.up] = samples
+        filtered = np.convolve(upsampled, self.taps)[:len(upsampled)]
+        start = self._history_len * self.up
+        # Keep every down-th sample of the whole stream, not of this chunk
+        offset = (-self._consumed * self.up) % self.down
+        out = filtered[start + offset::self.down]
+        self._history = samples[-self._history_len:]
+        self._consumed += len(pcm)
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+def resample(pcm, from_rate, to_rate):
+    """One-shot resampling of a whole PCM16 buffer, without the streaming delay."""
+    if from_rate == to_rate:
+        return np.asarray(pcm, dtype=np.int16)
+    resampler = Resampler(from_rate, to_rate)
+    upsampled = np.zeros(len(pcm) * resampler.up, dtype=np.float32)
+    upsampled[::resampler.up] = pcm
+    filtered = np.convolve(upsampled, resampler.taps, mode="same")[::resampler.down]
+    return np.clip(np.rint(filtered), -32768, 32767).astype(np.int16)
+
+
+def ulaw_to_pcm_rate(data, to_rate, resampler=None):
+    """Twilio µ-law to PCM16 at to_rate; pass a Resampler to convert a stream chunk by chunk."""
+    pcm = ulaw_to_pcm(data)
+    if to_rate == TWILIO_RATE:
+        return pcm
+    return resampler.process(pcm) if resampler else resample(pcm, TWILIO_RATE, to_rate)
+
+
+def pcm_rate_to_ulaw(pcm, from_rate, resampler=None):
+    """PCM16 at from_rate to Twilio µ-law; pass a Resampler to convert a stream chunk by chunk."""
+    if from_rate != TWILIO_RATE:
+        pcm = resampler.process(pcm) if resampler else resample(pcm, from_rate, TWILIO_RATE)
+    return pcm_to_ulaw(pcm)
@@ -0,0 +1,222 @@
+import json
+import os
+from collections import OrderedDict
+
+# Compaction of the realtime conversation on long calls (CONTEXT_COMPACTION=1). Every
+# item the server creates is tracked with an estimate of its token weight; once the total
+# is over the budget, the oldest items (tool outputs first, then earlier turns) are removed
+# with conversation.item.delete and their gist is kept in one short summary item at the
+# start of the conversation, so each turn's input stays about the same size however long the call.
+CONTEXT_COMPACTION_ENABLED = os.getenv("CONTEXT_COMPACTION", "").lower() in ("1", "true", "yes")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 8000))
+# Compaction brings the conversation back under this share of the budget, so it does not run every turn
+CONTEXT_TARGET_RATIO = 0.6
+KEEP_RECENT_ITEMS = int(os.getenv("CONTEXT_KEEP_RECENT_ITEMS", 8))
+# Realtime API rates: input audio is a token per 100 ms, output audio a token per 50 ms
+INPUT_AUDIO_TOKENS_PER_SECOND = 10
+OUTPUT_AUDIO_TOKENS_PER_SECOND = 20
+ULAW_BYTES_PER_SECOND = 8000
+CHARS_PER_TOKEN = 4
+ITEM_OVERHEAD_TOKENS = 5
+MAX_SUMMARY_LINE_CHARS = 200
+MAX_SUMMARY_CHARS = 2000
+SUMMARY_ITEM_PREFIX = "ctxsummary"
+
+
+def text_tokens(text):
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+class ConversationItem:
+    __slots__ = ("id", "type", "role", "name", "call_id", "text", "audio_ms", "tokens", "pinned")
+
+    def __init__(self, item):
+        self.id = item.get("id")
+        self.type = item.get("type")
+        self.role = item.get("role")
+        self.name = item.get("name")
+        self.call_id = item.get("call_id")
+        self.text = ""
+        self.audio_ms = 0
+        content = item.get("content") or []
+        # Text sent by the bridge itself (customer profile, greeting) is kept for the whole call
+        self.pinned = self.type == "message" and bool(content) and all(
+            part.get("type") in ("input_text", "text") for part in content)
+        if self.type == "message":
+            self.text = " ".join(part.get("text") or part.get("transcript") or "" for part in content)
+        elif self.type == "function_call":
+            self.text = item.get("arguments") or ""
+        elif self.type == "function_call_output":
+            self.text = item.get("output") or ""
+        self.tokens = 0
+        self.weigh()
+
+    def weigh(self):
+        rate = OUTPUT_AUDIO_TOKENS_PER_SECOND if self.role == "assistant" else INPUT_AUDIO_TOKENS_PER_SECOND
+        self.tokens = ITEM_OVERHEAD_TOKENS + text_tokens(self.text) + self.audio_ms * rate // 1000
+
+
+class ConversationContext:
+    """
+    Per-call view of the realtime conversation. Fed with the server events in
+    agents.agent.handle_call; compact() sends the deletes and the summary item.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, keep_recent=KEEP_RECENT_ITEMS):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.items = OrderedDict()  # item id -> ConversationItem, in conversation order
+        self.summary_lines = []
+        self.summary_item_id = None
+        self.compactions = 0
+        self.items_deleted = 0
+        self.tokens_removed = 0
+        self._speech_start_ms = {}
+        # Caller speech durations by item id: speech_stopped comes before the item is created
+        self._speech_ms = {}
+
+    @property
+    def tokens(self):
+        return sum(item.tokens for item in self.items.values())
+
+    def on_event(self, event):
+        """Update the tracked items from a Realtime API server event."""
+        event_type = event.get("type")
+        if event_type == "conversation.item.created":
+            item = event.get("item") or {}
+            if item.get("id"):
+                tracked = ConversationItem(item)
+                tracked.audio_ms = self._speech_ms.pop(item["id"], 0)
+                tracked.weigh()
+                self.items[item["id"]] = tracked
+        elif event_type == "conversation.item.deleted":
+            self.items.pop(event.get("item_id"), None)
+        elif event_type == "input_audio_buffer.speech_started":
+            self._speech_start_ms[event.get("item_id")] = event.get("audio_start_ms", 0)
+        elif event_type == "input_audio_buffer.speech_stopped":
+            started = self._speech_start_ms.pop(event.get("item_id"), None)
+            if started is not None:
+                audio_ms = max(event.get("audio_end_ms", started) - started, 0)
+                item = self.items.get(event.get("item_id"))
+                if item is None:
+                    self._speech_ms[event.get("item_id")] = audio_ms
+                else:
+                    item.audio_ms = audio_ms
+                    item.weigh()
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            self.set_text(event.get("item_id"), event.get("transcript"))
+        elif event_type == "response.done":
+            for output in (event.get("response") or {}).get("output") or []:
+                if output.get("type") == "message":
+                    self.set_text(output.get("id"), " ".join(
+                        part.get("transcript") or part.get("text") or "" for part in output.get("content") or []))
+                elif output.get("type") == "function_call":
+                    self.set_text(output.get("id"), output.get("arguments"))
+
+    def add_audio(self, item_id, byte_count):
+        """Assistant audio sent for item_id (g711 µ-law bytes)."""
+        item = self.items.get(item_id)
+        if item is not None:
+            item.audio_ms += byte_count * 1000 // ULAW_BYTES_PER_SECOND
+            item.weigh()
+
+    def set_text(self, item_id, text):
+        item = self.items.get(item_id)
+        if item is not None and text:
+            item.text = text
+            item.weigh()
+
+    def _summarize(self, item):
+        text = " ".join(item.text.split())
+        if len(text) > MAX_SUMMARY_LINE_CHARS:
+            text = text[:MAX_SUMMARY_LINE_CHARS - 3] + "..."
+        if item.type == "function_call":
+            return f"Called {item.name}({text})"
+        if item.type == "function_call_output":
+            return f"Tool result: {text}"
+        if text:
+            return f"{'Caller' if item.role == 'user' else 'Assistant'}: {text}"
+        return None
+
+    def _candidates(self):
+        """
+        Removable items as groups deleted together (a tool call with its output), tool
+        groups first, then the oldest turns. A group is kept whole if any of it is recent or pinned.
+        """
+        recent = set(list(self.items)[-self.keep_recent:]) if self.keep_recent else set()
+        groups = OrderedDict()
+        for item in self.items.values():
+            groups.setdefault(item.call_id or item.id, []).append(item)
+        removable = [group for group in groups.values()
+                     if not any(item.pinned or item.id in recent for item in group)]
+        tools = [group for group in removable if group[0].type in ("function_call", "function_call_output")]
+        turns = [group for group in removable if group[0].type not in ("function_call", "function_call_output")]
+        return tools + turns
+
+    def plan(self):
+        """Items to delete to get back under the target, or [] while under the budget."""
+        total = self.tokens
+        if total <= self.budget:
+            return []
+        target = self.budget * CONTEXT_TARGET_RATIO
+        chosen = []
+        for group in self._candidates():
+            if total <= target:
+                break
+            chosen.extend(group)
+            total -= sum(item.tokens for item in group)
+        return chosen
+
+    async def compact(self, openai_ws):
+        """
+        Delete stale items and refresh the summary item when over budget. Call between
+        responses (not while one is being generated). Returns the number of deleted items.
+        """
+        chosen = self.plan()
+        if not chosen:
+            return 0
+        tokens_before = self.tokens
+        # Keep the summary in conversation order even though tool items are removed first
+        order = list(self.items)
+        for item in sorted(chosen, key=lambda item: order.index(item.id)):
+            line = self._summarize(item)
+            if line:
+                self.summary_lines.append(line)
+        for item in chosen:
+            await openai_ws.send(json.dumps({"type": "conversation.item.delete", "item_id": item.id}))
+            del self.items[item.id]
+        await self._replace_summary(openai_ws)
+        self.compactions += 1
+        self.items_deleted += len(chosen)
+        self.tokens_removed += tokens_before - self.tokens
+        print(f"Context compacted: {len(chosen)} items deleted, ~{tokens_before} -> ~{self.tokens} tokens")
+        return len(chosen)
+
+    async def _replace_summary(self, openai_ws):
+        # The oldest lines go first when the summary gets too long
+        while len(self.summary_lines) > 1 and sum(len(line) + 1 for line in self.summary_lines) > MAX_SUMMARY_CHARS:
+            self.summary_lines.pop(0)
+        summary = "\n".join(self.summary_lines)
+        if self.summary_item_id:
+            await openai_ws.send(json.dumps({"type": "conversation.item.delete", "item_id": self.summary_item_id}))
+            self.items.pop(self.summary_item_id, None)
+        self.summary_item_id = f"{SUMMARY_ITEM_PREFIX}{self.compactions}"
+        await openai_ws.send(json.dumps({
+            "type": "conversation.item.create",
+            "previous_item_id": "root",
+            "item": {
+                "id": self.summary_item_id,
+                "type": "message",
+                "role": "system",
+                "content": [{"type": "input_text", "text": "Summary of the earlier part of this call:\n" + summary}],
+            },
+        }))
+
+    def stats(self):
+        return {
+            "items": len(self.items),
+            "tokens": self.tokens,
+            "compactions": self.compactions,
+            "items_deleted": self.items_deleted,
+            "tokens_removed": self.tokens_removed,
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+# Event-loop diagnostics for the gateway, enabled with LOOP_DIAGNOSTICS=1.
+# A heartbeat task measures how late the loop wakes it up (loop lag), and a watchdog
+# thread grabs the loop thread's stack while the heartbeat is overdue, so whatever
+# blocked the loop (sync DB calls, SMTP, Twilio REST...) is recorded with its stack.
+LOOP_DIAGNOSTICS = os.getenv("LOOP_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", 100))
+HEARTBEAT_INTERVAL = 0.05
+LAG_WINDOW = 1200  # heartbeat samples kept, one minute at the default interval
+MAX_SLOW_CALLBACKS = 100
+PROFILER_INTERVAL = 0.005
+
+
+def _stack_of(thread_id, limit=30):
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return []
+    return [line.rstrip() for line in traceback.format_stack(frame, limit=limit)]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(len(sorted_values) * q / 100), len(sorted_values) - 1)]
+
+
+class SamplingProfiler:
+    """Samples the loop thread's stack every few ms and counts collapsed stacks (flamegraph input)."""
+
+    def __init__(self, thread_id, interval=PROFILER_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        # Shared with the sampler thread: readers snapshot the samples under it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        with self._lock:
+            self.samples.clear()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                stack = ";".join(reversed(stack))
+                with self._lock:
+                    self.samples[stack] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.samples)
+
+    def collapsed(self):
+        """Samples in the collapsed-stack format read by flamegraph.pl and speedscope."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.snapshot().most_common())
+
+    def top(self, limit=20):
+        """Functions that were on top of the stack most often."""
+        leaves = Counter()
+        for stack, count in self.snapshot().items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{"function": name, "samples": count, "share": round(count / total, 3)}
+                for name, count in leaves.most_common(limit)]
+
+
+class LoopMonitor:
+    def __init__(self, slow_callback_ms=SLOW_CALLBACK_MS, interval=HEARTBEAT_INTERVAL):
+        self.slow_callback = slow_callback_ms / 1000
+        self.interval = interval
+        self.lags = deque(maxlen=LAG_WINDOW)
+        self.slow_callbacks = deque(maxlen=MAX_SLOW_CALLBACKS)
+        self.slow_callback_count = 0
+        self.profiler = None
+        self._loop_thread_id = None
+        self._heartbeat = None
+        self._stall_stack = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task = None
+
+    def start(self):
+        """Start monitoring the running loop; call from inside it (e.g. an app startup hook)."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self.profiler = SamplingProfiler(self._loop_thread_id)
+        self._task = asyncio.create_task(self._beat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+        if self.profiler:
+            self.profiler.stop()
+
+    def reset(self):
+        with self._lock:
+            self.lags.clear()
+            self.slow_callbacks.clear()
+            self.slow_callback_count = 0
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            with self._lock:
+                self._heartbeat = now
+                self.lags.append(lag)
+                if lag >= self.slow_callback:
+                    self.slow_callback_count += 1
+                    record = {
+                        "at": time.time(),
+                        "blocked_ms": round(lag * 1000, 1),
+                        "stack": self._stall_stack or [],
+                    }
+                    self.slow_callbacks.append(record)
+                    print(f"Event loop blocked for {record['blocked_ms']}ms"
+                          + (f" in {record['stack'][-1].splitlines()[0].strip()}" if record["stack"] else ""))
+                self._stall_stack = None
+
+    def _watch(self):
+        # Wakes up a few times per threshold; the first time the heartbeat is overdue by more
+        # than the threshold, the loop thread is still inside the blocking call.
+        while not self._stop.wait(self.slow_callback / 4):
+            with self._lock:
+                overdue = time.monotonic() - self._heartbeat - self.interval
+                if overdue >= self.slow_callback and self._stall_stack is None:
+                    self._stall_stack = _stack_of(self._loop_thread_id)
+
+    def snapshot(self):
+        with self._lock:
+            lags = sorted(self.lags)
+            slow = list(self.slow_callbacks)
+            count = self.slow_callback_count
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "slow_callback_threshold_ms": self.slow_callback * 1000,
+            "lag": {
+                "samples": len(lags),
+                "p50_ms": ms(_percentile(lags, 50)),
+                "p95_ms": ms(_percentile(lags, 95)),
+                "p99_ms": ms(_percentile(lags, 99)),
+                "max_ms": ms(lags[-1] if lags else None),
+            },
+            "slow_callback_count": count,
+            "slow_callbacks": slow,
+            "profiler": {
+                "running": bool(self.profiler and self.profiler.running),
+                "started_at": self.profiler.started_at if self.profiler else None,
+                "samples": sum(self.profiler.snapshot().values()) if self.profiler else 0,
+            },
+        }
+
+
+# Process-wide monitor, None unless LOOP_DIAGNOSTICS is set
+loop_monitor = LoopMonitor() if LOOP_DIAGNOSTICS else None
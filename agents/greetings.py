@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+
+import websockets
+
+# Pre-rendered greeting audio. The greeting is the same on every call, so instead of
+# having the model speak it (several seconds of generation and audio tokens per call)
+# it is rendered once per voice and language to g711 µ-law, kept on disk and in memory,
+# and streamed to Twilio as soon as the media stream starts. Enabled with GREETING_CACHE=1;
+# rendering opens a Realtime session per language, at startup or with python -m agents.greetings.
+GREETING_CACHE_ENABLED = os.getenv("GREETING_CACHE", "").lower() in ("1", "true", "yes")
+GREETING_CACHE_DIR = os.getenv(
+    "GREETING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "greetings"))
+GREETING_LANGUAGES = tuple(os.getenv("GREETING_LANGUAGES", "en,fr,ar").split(","))
+GREETINGS = {
+    "en": "Hello there! I am an AI voice assistant for Moravelo Hotel Group where comfort meets elegance.",
+    "fr": "Bonjour ! Je suis un assistant vocal IA du groupe hôtelier Moravelo, où le confort rencontre l'élégance.",
+    "ar": "مرحبا! أنا مساعد صوتي بالذكاء الاصطناعي لمجموعة فنادق مورافيلو، حيث تلتقي الراحة بالأناقة.",
+}
+FRAME_BYTES = 160  # 20 ms of 8 kHz µ-law
+# Frames per Twilio media message; Twilio buffers and plays them at its own pace
+FRAMES_PER_MESSAGE = 25
+
+
+def greeting_path(voice, language):
+    # The text's hash is part of the name, so editing a greeting renders it again
+    digest = hashlib.sha1(GREETINGS[language].encode("utf-8")).hexdigest()[:12]
+    return os.path.join(GREETING_CACHE_DIR, f"{voice}-{language}-{digest}.ulaw")
+
+
+def greeting_transcript(languages=GREETING_LANGUAGES):
+    return " ".join(GREETINGS[language] for language in languages)
+
+
+async def render_greeting(text, voice, realtime_url, api_key):
+    """Have the realtime model read `text` once and return the g711 µ-law audio."""
+    headers = {"Authorization": f"Bearer {api_key}", "OpenAI-Beta": "realtime=v1"}
+    audio = bytearray()
+    async with websockets.connect(realtime_url, extra_headers=headers) as openai_ws:
+        await openai_ws.send(json.dumps({"type": "session.update", "session": {
+            "voice": voice,
+            "output_audio_format": "g711_ulaw",
+            "modalities": ["text", "audio"],
+            "instructions": "Read the user's text aloud exactly as written, in its language, and say nothing else.",
+            "turn_detection": None,
+        }}))
+        await openai_ws.send(json.dumps({"type": "conversation.item.create", "item": {
+            "type": "message", "role": "user", "content": [{"type": "input_text", "text": text}]}}))
+        await openai_ws.send(json.dumps({"type": "response.create"}))
+        async for message in openai_ws:
+            event = json.loads(message)
+            if event.get("type") == "response.audio.delta":
+                audio.extend(base64.b64decode(event["delta"]))
+            elif event.get("type") == "response.done":
+                break
+            elif event.get("type") == "error":
+                raise RuntimeError(f"Greeting rendering failed: {event.get('error')}")
+    return bytes(audio)
+
+
+class GreetingCache:
+    def __init__(self, languages=GREETING_LANGUAGES):
+        self.languages = languages
+        self._audio = {}
+        self._rendering = None
+
+    def _load(self, voice, language):
+        key = (voice, language)
+        if key not in self._audio:
+            try:
+                with open(greeting_path(voice, language), "rb") as f:
+                    self._audio[key] = f.read()
+            except FileNotFoundError:
+                return None
+        return self._audio[key]
+
+    def get(self, voice):
+        """The full greeting for `voice` (every language in order), or None if any part is not rendered."""
+        parts = [self._load(voice, language) for language in self.languages]
+        if not all(parts):
+            return None
+        return b"".join(parts)
+
+    async def render_missing(self, voice, realtime_url, api_key):
+        """Render and store the greetings not on disk yet; safe to call concurrently."""
+        if self._rendering is None or self._rendering.done():
+            self._rendering = asyncio.create_task(self._render_missing(voice, realtime_url, api_key))
+        await self._rendering
+
+    async def _render_missing(self, voice, realtime_url, api_key):
+        os.makedirs(GREETING_CACHE_DIR, exist_ok=True)
+        for language in self.languages:
+            if self._load(voice, language):
+                continue
+            print(f"Rendering the {language} greeting with voice {voice}...")
+            audio = await render_greeting(GREETINGS[language], voice, realtime_url, api_key)
+            path = greeting_path(voice, language)
+            with open(path + ".tmp", "wb") as f:
+                f.write(audio)
+            os.replace(path + ".tmp", path)
+            self._audio[(voice, language)] = audio
+
+
+async def stream_greeting(websocket, audio):
+    """
+    Wait for Twilio's start event, then send the greeting audio and a mark after it.
+    Returns the stream SID.
+    """
+    stream_sid = None
+    while stream_sid is None:
+        data = json.loads(await websocket.receive_text())
+        if data.get("event") == "start":
+            stream_sid = data["start"]["streamSid"]
+    chunk = FRAME_BYTES * FRAMES_PER_MESSAGE
+    for offset in range(0, len(audio), chunk):
+        await websocket.send_json({
+            "event": "media",
+            "streamSid": stream_sid,
+            "media": {"payload": base64.b64encode(audio[offset:offset + chunk]).decode("ascii")},
+        })
+    await websocket.send_json({"event": "mark", "streamSid": stream_sid, "mark": {"name": "greeting"}})
+    return stream_sid
+
+
+greeting_cache = GreetingCache()
+
+
+if __name__ == "__main__":
+    # python -m agents.greetings: render the greetings for the configured voice ahead of time
+    from agents.agent import OPENAI_API_KEY, OPENAI_REALTIME_URL, VOICE
+
+    asyncio.run(greeting_cache.render_missing(VOICE, OPENAI_REALTIME_URL, OPENAI_API_KEY))
+    print(f"Greetings for voice {VOICE} are in {GREETING_CACHE_DIR}")
@@ -0,0 +1,289 @@
+import asyncio
+import os
+import re
+import time
+import unicodedata
+from datetime import date, timedelta
+
+from tools.tools import get_available_rooms, hold_rooms, hotel_directory
+
+# Speculative availability lookups (AVAILABILITY_PREFETCH=1). The caller's and the
+# assistant's transcripts are scanned for an area of the hotel directory and a stay
+# ("from the 3rd to the 5th of May", "du 3 au 5 mai", "June 3 to 7", "tomorrow for 2
+# nights"); vague durations ("a night or two") are ignored rather than guessed. Once both
+# are known, the unfiltered availability of that area and period is fetched in the
+# background. When the model then calls get_available_rooms_function for it, tools.functioncalling answers
+# from this per-call cache, applying room_type and max_guests locally.
+AVAILABILITY_PREFETCH_ENABLED = os.getenv("AVAILABILITY_PREFETCH", "").lower() in ("1", "true", "yes")
+# Lookups started per call at most
+PREFETCH_BUDGET = int(os.getenv("AVAILABILITY_PREFETCH_BUDGET", 4))
+# A prefetched result older than this is not used (bookings made meanwhile by other calls)
+PREFETCH_TTL = float(os.getenv("AVAILABILITY_PREFETCH_TTL", 60))
+MAX_NIGHTS = 60
+
+MONTHS = {
+    "january": 1, "janvier": 1, "february": 2, "fevrier": 2, "march": 3, "mars": 3, "april": 4, "avril": 4,
+    "may": 5, "mai": 5, "june": 6, "juin": 6, "july": 7, "juillet": 7, "august": 8, "aout": 8,
+    "september": 9, "septembre": 9, "october": 10, "octobre": 10, "november": 11, "novembre": 11,
+    "december": 12, "decembre": 12,
+}
+NUMBER_WORDS = {
+    "one": 1, "a": 1, "un": 1, "une": 1, "two": 2, "deux": 2, "three": 3, "trois": 3, "four": 4, "quatre": 4,
+    "five": 5, "cinq": 5, "six": 6, "seven": 7, "sept": 7, "a week": 7, "une semaine": 7,
+}
+# Other spellings callers use for the directory's areas
+AREA_ALIASES = {"casa": "casablanca", "fes": "fez", "tanger": "tangier", "marrakesh": "marrakech", "tanja": "tangier"}
+
+_MONTH = "|".join(MONTHS)
+_DAY = r"(\d{1,2})(?:st|nd|rd|th|er)?"
+DATE_PATTERN = re.compile(
+    rf"\b(?:(\d{{4}})-(\d{{2}})-(\d{{2}})"
+    rf"|{_DAY}\s+(?:of\s+)?({_MONTH})"
+    rf"|({_MONTH})\s+(?:the\s+)?{_DAY}"
+    rf"|(today|aujourd'hui|tomorrow|demain))\b")
+# A range of days sharing one month: "the 3rd to the 5th of May", "du 3 au 5 mai", "May 3-5"
+_TO = r"(?:\s*[-\u2013]\s*|\s+(?:to|until|till|and|au|a|et|jusqu'au)\s+(?:the\s+|le\s+)?)"
+RANGE_PATTERN = re.compile(
+    rf"\b(?:the\s+|le\s+)?{_DAY}{_TO}{_DAY}\s+(?:of\s+)?({_MONTH})\b"
+    rf"|\b({_MONTH})\s+(?:the\s+)?{_DAY}{_TO}{_DAY}\b")
+# "May" is also the verb ("I may need 2 nights", "may 3 people come"): it only counts as
+# the month with an ordinal day or "of"/"the" around it ("May 3rd", "the 3rd of May")
+MAY_CONTEXT = re.compile(r"\d(?:st|nd|rd|th)\b|\b(?:of|the)\b")
+NIGHTS_PATTERN = re.compile(
+    rf"\b(\d{{1,2}}|{'|'.join(sorted(NUMBER_WORDS, key=len, reverse=True))})\s+(nights?|nuits?|days?|jours?|weeks?|semaines?)\b"
+    # "a night or two", "un jour ou deux": no number to rely on
+    r"(?!\s+(?:or|ou)\b)")
+
+
+def normalize(text):
+    """Lowercase without accents, so "Fès" and "fes", "Août" and "aout" match."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def find_area(text, areas):
+    """The last directory area named in text, or None."""
+    text = normalize(text)
+    by_name = {normalize(area): area for area in areas}
+    by_name.update((alias, by_name[name]) for alias, name in AREA_ALIASES.items() if name in by_name)
+    found = None
+    for name, area in by_name.items():
+        for match in re.finditer(rf"\b{re.escape(name)}\b", text):
+            if found is None or match.start() > found[0]:
+                found = (match.start(), area)
+    return found[1] if found else None
+
+
+def _upcoming(today, month, day):
+    """The next date with this month and day, today included."""
+    try:
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def _range(today, month, first_day, last_day):
+    """Both ends of a range of days named with one month; a first day after the last is in the month before."""
+    end = _upcoming(today, month, last_day)
+    if end is None:
+        return []
+    try:
+        if first_day < last_day:
+            return [date(end.year, month, first_day), end]
+        year, month = (end.year, month - 1) if month > 1 else (end.year - 1, 12)
+        return [date(year, month, first_day), end]
+    except ValueError:
+        return []
+
+
+def _is_verb_may(match, month):
+    return month == "may" and not MAY_CONTEXT.search(match.group(0))
+
+
+def _single_date(match, today):
+    """The date of one DATE_PATTERN match, or None when it is not a valid date."""
+    iso_year, iso_month, iso_day, day_first, month_after, month_first, day_after, relative = match.groups()
+    if iso_year:
+        try:
+            return date(int(iso_year), int(iso_month), int(iso_day))
+        except ValueError:
+            return None
+    if _is_verb_may(match, month_after or month_first):
+        return None
+    if day_first:
+        return _upcoming(today, MONTHS[month_after], int(day_first))
+    if month_first:
+        return _upcoming(today, MONTHS[month_first], int(day_after))
+    if relative in ("today", "aujourd'hui"):
+        return today
+    return today + timedelta(days=1)
+
+
+def find_dates(text, today):
+    """Dates mentioned in text, in order of appearance; a range gives both of its ends."""
+    text = normalize(text)
+    found = []  # (position, dates)
+    for match in RANGE_PATTERN.finditer(text):
+        first_day, last_day, month_after, month_first, first_after, last_after = match.groups()
+        if _is_verb_may(match, month_after or month_first):
+            continue
+        if month_after:
+            found.append((match.span(), _range(today, MONTHS[month_after], int(first_day), int(last_day))))
+        else:
+            found.append((match.span(), _range(today, MONTHS[month_first], int(first_after), int(last_after))))
+    ranges = [span for span, _ in found]
+    for match in DATE_PATTERN.finditer(text):
+        if not any(start <= match.start() < end for start, end in ranges):
+            found.append((match.span(), [_single_date(match, today)]))
+    return [found_date for _, dates in sorted(found, key=lambda entry: entry[0])
+            for found_date in dates if found_date is not None]
+
+
+def find_nights(text):
+    match = NIGHTS_PATTERN.search(normalize(text))
+    if not match:
+        return None
+    count = int(match.group(1)) if match.group(1).isdigit() else NUMBER_WORDS[match.group(1)]
+    if match.group(2).startswith(("week", "semaine")):
+        count *= 7
+    return count if 0 < count <= MAX_NIGHTS else None
+
+
+def filter_rooms(result, area, room_type=None, max_guests=None):
+    """Apply get_available_rooms' optional filters to its unfiltered result."""
+    if not isinstance(result, list):
+        return result  # "No hotels found in the area ..." does not depend on the filters
+    rooms = [room for room in result
+             if (not room_type or room["room_type"] == room_type)
+             and (not max_guests or room["max_guests"] >= max_guests)]
+    if not rooms:
+        return (f"No rooms available in the area '{area}' for the selected dates, room type: {room_type}, "
+                f"and max guests: {max_guests}.")
+    return rooms
+
+
+class AvailabilityPrefetcher:
+    """
+    Per-call speculative cache of get_available_rooms results, keyed by (area, check-in,
+    check-out). Only one lookup runs at a time: when the caller changes their mind, the
+    superseded one is cancelled (its query finishes in its worker thread, unused).
+    """
+
+    def __init__(self, budget=PREFETCH_BUDGET, ttl=PREFETCH_TTL, today=None, hold_key=None):
+        self.budget = budget
+        # The call's room hold key: lookups skip rooms held for other calls, and rooms are
+        # only held for this one once a prefetched result is actually used
+        self.hold_key = hold_key
+        self.ttl = ttl
+        self.today = today or date.today()
+        self.areas = ()
+        self.area = None
+        self.check_in = None
+        self.check_out = None
+        self._entries = {}  # (area, check_in, check_out) -> (started at, task)
+        self._in_flight = None
+        self.started = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hits = 0
+        self.waited = 0
+        self.misses = 0
+        self.expired = 0
+
+    async def start(self):
+        """Load the directory's areas; until then transcripts are ignored."""
+        try:
+            self.areas = await asyncio.to_thread(hotel_directory.areas)
+        except Exception as e:
+            print(f"Availability prefetch disabled for this call, no hotel directory: {e}")
+
+    def observe(self, text):
+        """Scan a transcript; starts a lookup once an area and a whole stay are known."""
+        if not text or not self.areas:
+            return
+        self.area = find_area(text, self.areas) or self.area
+        dates = find_dates(text, self.today)
+        nights = find_nights(text)
+        if dates:
+            self.check_in = dates[0]
+            self.check_out = dates[1] if len(dates) > 1 and dates[1] > dates[0] else None
+        if nights and self.check_in:
+            self.check_out = self.check_in + timedelta(days=nights)
+        if self.area and self.check_in and self.check_out:
+            self._prefetch((self.area, self.check_in, self.check_out))
+
+    def _prefetch(self, key):
+        if key in self._entries or self.started >= self.budget:
+            return
+        if self._in_flight is not None and not self._in_flight[1].done():
+            self._in_flight[1].cancel()
+            self._entries.pop(self._in_flight[0], None)
+            self.cancelled += 1
+        area, check_in, check_out = key
+        task = asyncio.create_task(asyncio.to_thread(
+            get_available_rooms, check_in, check_out, area, hold_key=self.hold_key, place_holds=False))
+        task.add_done_callback(self._finished)
+        self._entries[key] = (time.monotonic(), task)
+        self._in_flight = (key, task)
+        self.started += 1
+        print(f"Prefetching availability in {area} from {check_in} to {check_out}")
+
+    def _finished(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            for key, (_, entry_task) in list(self._entries.items()):
+                if entry_task is task:
+                    del self._entries[key]
+
+    async def lookup(self, check_in, check_out, area, room_type=None, max_guests=None):
+        """The prefetched result for these arguments (waiting for it if still running), or None."""
+        key = next((key for key in self._entries
+                    if normalize(key[0]) == normalize(area) and key[1:] == (check_in, check_out)), None)
+        if key is None:
+            self.misses += 1
+            return None
+        started_at, task = self._entries[key]
+        if time.monotonic() - started_at > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            return None
+        if task.done():
+            self.hits += 1
+        else:
+            self.waited += 1
+        try:
+            result = await asyncio.shield(task)
+        except (asyncio.CancelledError, Exception):
+            return None
+        rooms = filter_rooms(result, key[0], room_type, max_guests)
+        if self.hold_key and isinstance(rooms, list):
+            rooms = await asyncio.to_thread(hold_rooms, self.hold_key, check_in, check_out, rooms)
+        return rooms
+
+    def invalidate(self):
+        """Forget the results, e.g. after this call booked a room."""
+        self._entries.clear()
+
+    def close(self):
+        for _, task in self._entries.values():
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+        self._entries.clear()
+
+    def stats(self):
+        served = self.hits + self.waited
+        return {
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "hits": self.hits,
+            "waited": self.waited,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(served / (served + self.misses + self.expired), 3)
+            if served + self.misses + self.expired else None,
+        }
@@ -0,0 +1,249 @@
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import wave
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agents.codec import ulaw_to_pcm, TWILIO_RATE
+
+# Opt-in call recording (CALL_RECORDING=1). The relay only appends the base64 payloads it
+# already has to bounded per-call deques; one background thread decodes them, lays both
+# directions out on the caller's timeline (left: caller, right: assistant) and writes
+# gzip-compressed stereo WAV chunks, so recording never adds work to the event loop.
+#
+#   <CALL_RECORDING_DIR>/<YYYY-MM-DD>/<call id>/chunk-0001.wav.gz ... call.json
+CALL_RECORDING_ENABLED = os.getenv("CALL_RECORDING", "").lower() in ("1", "true", "yes")
+CALL_RECORDING_DIR = os.getenv(
+    "CALL_RECORDING_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "recordings"))
+CHUNK_SECONDS = float(os.getenv("CALL_RECORDING_CHUNK_SECONDS", 10))
+# Audio held in memory per call and direction if the writer falls behind; older audio is dropped
+MAX_BUFFER_SECONDS = int(os.getenv("CALL_RECORDING_BUFFER_SECONDS", 60))
+RETENTION_DAYS = int(os.getenv("CALL_RECORDING_RETENTION_DAYS", 30))
+MAX_ARCHIVE_BYTES = int(float(os.getenv("CALL_RECORDING_MAX_GB", 20)) * 1024 ** 3)
+RETENTION_CHECK_SECONDS = 3600
+SAMPLES_PER_MS = TWILIO_RATE // 1000
+FRAMES_PER_SECOND = 50
+# OpenAI audio deltas are larger than Twilio's 20 ms frames, a few per second
+ASSISTANT_DELTAS_PER_SECOND = 10
+
+
+class CallRecording:
+    """Tee of one call's audio. Every method is a deque append, safe to call from the relay."""
+
+    def __init__(self, call_id, direction, phone_number=None):
+        self.call_id = call_id
+        self.direction = direction
+        self.phone_number = phone_number
+        self.started_at = datetime.utcnow()
+        self.directory = os.path.join(CALL_RECORDING_DIR, self.started_at.strftime("%Y-%m-%d"), call_id)
+        self.caller = deque(maxlen=MAX_BUFFER_SECONDS * FRAMES_PER_SECOND)
+        self.assistant = deque(maxlen=MAX_BUFFER_SECONDS * ASSISTANT_DELTAS_PER_SECOND)
+        self.finished = False
+        self.frames_in = 0
+        # Writer-side state, only touched by the worker thread
+        self.chunks = 0
+        self.frames_written = 0
+        self.chunk_start_ms = None
+        self.assistant_cursor_ms = 0
+        self.pending = []  # (start_ms, pcm) of assistant audio past the end of the last chunk
+
+    def caller_audio(self, timestamp_ms, payload):
+        self.frames_in += 1
+        self.caller.append((timestamp_ms, payload))
+
+    def assistant_audio(self, timestamp_ms, payload):
+        """payload is a base64 media payload, or raw µ-law bytes (the cached greeting)."""
+        self.assistant.append((timestamp_ms, payload))
+
+    def cleared(self, timestamp_ms):
+        """Twilio was told to drop the assistant audio not played yet (caller barged in)."""
+        self.assistant.append((timestamp_ms, None))
+
+    def stop(self):
+        self.finished = True
+
+
+def _decode(payload):
+    return payload if isinstance(payload, bytes) else base64.b64decode(payload)
+
+
+def _drain(buffer):
+    items = []
+    while buffer:
+        items.append(buffer.popleft())
+    return items
+
+
+def _place(stereo, channel, offset, pcm):
+    """Copy pcm into one channel from sample `offset` on; returns how many samples of it were consumed."""
+    skipped = max(-offset, 0)
+    fitted = pcm[skipped:skipped + max(len(stereo) - max(offset, 0), 0)]
+    stereo[max(offset, 0):max(offset, 0) + len(fitted), channel] = fitted
+    return skipped + len(fitted)
+
+
+def _wav_gz(stereo):
+    raw = io.BytesIO()
+    with wave.open(raw, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(TWILIO_RATE)
+        wav.writeframes(stereo.astype("<i2").tobytes())
+    return gzip.compress(raw.getvalue(), compresslevel=6)
+
+
+class RecordingWriter:
+    """Background thread flushing every active recording to disk every CHUNK_SECONDS."""
+
+    def __init__(self, interval=CHUNK_SECONDS):
+        self.interval = interval
+        self._recordings = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_retention_check = 0.0
+
+    def start_recording(self, call_id, direction, phone_number=None):
+        recording = CallRecording(str(call_id or uuid.uuid4()), direction, phone_number)
+        with self._lock:
+            self._recordings[recording.call_id] = recording
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="call-recorder", daemon=True)
+                self._thread.start()
+        return recording
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                recordings = list(self._recordings.values())
+            for recording in recordings:
+                try:
+                    if recording.finished:
+                        self._finish(recording)
+                    else:
+                        self.flush(recording)
+                except Exception as e:
+                    # e.g. disk full: stop recording this call, the others and retention carry on
+                    print(f"Recording of call {recording.call_id} failed: {e}")
+                    recording.finished = True
+                    with self._lock:
+                        self._recordings.pop(recording.call_id, None)
+            if time.monotonic() - self._last_retention_check > RETENTION_CHECK_SECONDS:
+                self._last_retention_check = time.monotonic()
+                try:
+                    apply_retention()
+                except OSError as e:
+                    print(f"Recording retention failed: {e}")
+
+    def flush(self, recording):
+        """Mix what was buffered since the last flush into one stereo chunk on the caller's timeline."""
+        caller = _drain(recording.caller)
+        assistant = _drain(recording.assistant)
+        if not caller and not assistant and not recording.pending:
+            return
+        caller_pcm = [(timestamp, ulaw_to_pcm(_decode(payload))) for timestamp, payload in caller]
+        start_ms = recording.chunk_start_ms
+        if start_ms is None:
+            start_ms = caller_pcm[0][0] if caller_pcm else 0
+
+        # Twilio plays assistant audio back to back, starting when it arrives at the earliest
+        segments = recording.pending
+        for timestamp, payload in assistant:
+            if payload is None:
+                # Cleared: whatever was queued past this point was never played
+                segments = [(at_ms, pcm[:max(timestamp - at_ms, 0) * SAMPLES_PER_MS]) for at_ms, pcm in segments]
+                recording.assistant_cursor_ms = timestamp
+                continue
+            pcm = ulaw_to_pcm(_decode(payload))
+            at_ms = max(recording.assistant_cursor_ms, timestamp)
+            recording.assistant_cursor_ms = at_ms + len(pcm) // SAMPLES_PER_MS
+            segments.append((at_ms, pcm))
+
+        end_ms = max((timestamp + len(pcm) // SAMPLES_PER_MS for timestamp, pcm in caller_pcm), default=start_ms)
+        if recording.finished:
+            # Last chunk: keep the assistant's tail even after the caller's audio ended
+            end_ms = max([end_ms] + [at_ms + len(pcm) // SAMPLES_PER_MS for at_ms, pcm in segments])
+        if end_ms <= start_ms:
+            recording.pending = segments
+            return
+
+        stereo = np.zeros(((end_ms - start_ms) * SAMPLES_PER_MS, 2), dtype=np.int16)
+        for timestamp, pcm in caller_pcm:
+            _place(stereo, 0, (timestamp - start_ms) * SAMPLES_PER_MS, pcm)
+        recording.pending = []
+        for at_ms, pcm in segments:
+            written = _place(stereo, 1, (at_ms - start_ms) * SAMPLES_PER_MS, pcm)
+            if written < len(pcm):
+                recording.pending.append((max(at_ms + written // SAMPLES_PER_MS, end_ms), pcm[written:]))
+        recording.chunk_start_ms = end_ms
+
+        os.makedirs(recording.directory, exist_ok=True)
+        recording.chunks += 1
+        path = os.path.join(recording.directory, f"chunk-{recording.chunks:04d}.wav.gz")
+        with open(path + ".tmp", "wb") as f:
+            f.write(_wav_gz(stereo))
+        os.replace(path + ".tmp", path)
+        recording.frames_written += len(caller)
+
+    def _finish(self, recording):
+        try:
+            self.flush(recording)
+        finally:
+            with self._lock:
+                self._recordings.pop(recording.call_id, None)
+        if not recording.chunks:
+            return
+        metadata = {
+            "call_id": recording.call_id,
+            "direction": recording.direction,
+            "phone_number": recording.phone_number,
+            "started_at": recording.started_at.isoformat(),
+            "ended_at": datetime.utcnow().isoformat(),
+            "chunks": recording.chunks,
+            "sample_rate": TWILIO_RATE,
+            "channels": {"left": "caller", "right": "assistant"},
+            "caller_frames_dropped": recording.frames_in - recording.frames_written,
+        }
+        with open(os.path.join(recording.directory, "call.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+
+
+def apply_retention(root=CALL_RECORDING_DIR, retention_days=RETENTION_DAYS, max_bytes=MAX_ARCHIVE_BYTES):
+    """Delete day directories older than the retention period, then the oldest days beyond max_bytes."""
+    if not os.path.isdir(root):
+        return
+    days = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    oldest_kept = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    sizes = {}
+    for day in days:
+        if day < oldest_kept:
+            shutil.rmtree(os.path.join(root, day), ignore_errors=True)
+            continue
+        sizes[day] = sum(entry.stat().st_size for call in os.scandir(os.path.join(root, day)) if call.is_dir()
+                         for entry in os.scandir(call.path))
+    total = sum(sizes.values())
+    # Never delete today's directory, calls may still be writing to it
+    for day in sorted(sizes)[:-1]:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(root, day), ignore_errors=True)
+        total -= sizes[day]
+
+
+recording_writer = RecordingWriter()
+
+
+def start_recording(call_id, direction, phone_number=None):
+    """A CallRecording for the call, or None when CALL_RECORDING is off."""
+    if not CALL_RECORDING_ENABLED:
+        return None
+    return recording_writer.start_recording(call_id, direction, phone_number)
@@ -0,0 +1,116 @@
+import base64
+import os
+from collections import deque
+
+from agents.codec import ulaw_to_pcm, rms_dbfs, zero_crossing_rate
+
+# Optional local voice-activity detection on the inbound Twilio audio (LOCAL_VAD=1).
+# Each 20 ms µ-law frame is decoded (agents.codec) and scored on energy and zero-crossing
+# rate with a few vectorized NumPy operations (constant cost per frame, no model, CPU only).
+# Silence is not forwarded to the Realtime API once the hangover has elapsed; the
+# frames just before an onset are kept and flushed with it so no word start is lost.
+# server_vad still decides turns: the hangover is longer than its silence window.
+LOCAL_VAD_ENABLED = os.getenv("LOCAL_VAD", "").lower() in ("1", "true", "yes")
+LOCAL_VAD_BARGE_IN = os.getenv("LOCAL_VAD_BARGE_IN", "1").lower() not in ("0", "false", "no")
+# Margin above the tracked noise floor, and the absolute level, a frame needs to count as voice
+VAD_MARGIN_DB = float(os.getenv("LOCAL_VAD_MARGIN_DB", 12))
+VAD_MIN_LEVEL_DB = float(os.getenv("LOCAL_VAD_MIN_LEVEL_DB", -50))
+# Above this zero-crossing rate a quiet frame is hiss rather than voice
+VAD_MAX_ZCR = 0.35
+ONSET_FRAMES = 3       # 60 ms of voice before speech is declared
+HANGOVER_FRAMES = 40   # 800 ms forwarded after the last voiced frame, server_vad waits 500 ms
+PREROLL_FRAMES = 10    # 200 ms kept during silence, flushed at the onset
+# Forward one silent frame out of this many (0: none) so the server's input buffer keeps moving
+KEEP_SILENT_EVERY = int(os.getenv("LOCAL_VAD_KEEP_SILENT_EVERY", 0))
+NOISE_FLOOR_ADAPTATION = 0.05
+
+
+class VoiceActivityDetector:
+    """Per-call VAD state; process() is called for every inbound frame."""
+
+    def __init__(self, margin_db=VAD_MARGIN_DB, min_level_db=VAD_MIN_LEVEL_DB, onset_frames=ONSET_FRAMES,
+                 hangover_frames=HANGOVER_FRAMES, preroll_frames=PREROLL_FRAMES, keep_silent_every=KEEP_SILENT_EVERY):
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+        self.keep_silent_every = keep_silent_every
+        self.noise_floor_db = -60.0
+        self.speaking = False
+        self._voiced_run = 0
+        self._hangover = 0
+        self._silent_run = 0
+        self._preroll = deque(maxlen=preroll_frames)
+        self.frames = 0
+        self.frames_forwarded = 0
+        self.bytes_in = 0
+        self.bytes_forwarded = 0
+        self.speech_onsets = 0
+
+    def score(self, frame):
+        """(level in dBFS, zero-crossing rate) of a µ-law frame."""
+        pcm = ulaw_to_pcm(frame)
+        return rms_dbfs(pcm), zero_crossing_rate(pcm)
+
+    def is_voice(self, level_db, zcr):
+        threshold = max(self.noise_floor_db + self.margin_db, self.min_level_db)
+        # Unvoiced consonants have a high ZCR too, but they are louder than line hiss
+        return level_db > threshold and (zcr < VAD_MAX_ZCR or level_db > threshold + 10)
+
+    def process(self, payload):
+        """
+        Takes a base64 Twilio media payload. Returns (payloads to forward, speech_started):
+        nothing while silent, the pre-roll plus the frame at an onset, the frame otherwise.
+        """
+        frame = base64.b64decode(payload)
+        self.frames += 1
+        self.bytes_in += len(frame)
+        level_db, zcr = self.score(frame)
+        voiced = self.is_voice(level_db, zcr)
+        speech_started = False
+
+        if voiced:
+            self._voiced_run += 1
+        else:
+            self._voiced_run = 0
+            if not self.speaking:
+                self.noise_floor_db += (level_db - self.noise_floor_db) * NOISE_FLOOR_ADAPTATION
+
+        if not self.speaking and self._voiced_run >= self.onset_frames:
+            self.speaking = True
+            self.speech_onsets += 1
+            speech_started = True
+        if self.speaking:
+            if voiced:
+                self._hangover = self.hangover_frames
+            else:
+                self._hangover -= 1
+                if self._hangover <= 0:
+                    self.speaking = False
+
+        if self.speaking:
+            forward = list(self._preroll) + [payload]
+            self._preroll.clear()
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+            if self.keep_silent_every and self._silent_run % self.keep_silent_every == 0:
+                forward = [payload]
+            else:
+                forward = []
+                self._preroll.append(payload)
+
+        self.frames_forwarded += len(forward)
+        self.bytes_forwarded += sum(len(item) * 3 // 4 - item.count("=", -2) for item in forward)
+        return forward, speech_started
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "frames_forwarded": self.frames_forwarded,
+            "bytes_in": self.bytes_in,
+            "bytes_saved": max(self.bytes_in - self.bytes_forwarded, 0),
+            "saved_ratio": round(1 - self.bytes_forwarded / self.bytes_in, 3) if self.bytes_in else 0.0,
+            "speech_onsets": self.speech_onsets,
+            "noise_floor_db": round(self.noise_floor_db, 1),
+        }
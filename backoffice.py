@@ -1,22 +1,94 @@
-import asyncio
+import os
 
 import streamlit as st
 import requests
 import pandas as pd
 
-from outboundcall import make_call
+# Base URL of the FastAPI server (main.py)
+BOOKINGS_API_URL = os.getenv("BOOKINGS_API_URL", "http://localhost:5050").rstrip("/")
+PAGE_SIZE = 50
+# Seconds a fetched page is reused across reruns (every click is a rerun)
+CACHE_TTL = 30
 
 
-# Function to fetch bookings from the API
-def fetch_bookings():
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_bookings_page(page, page_size, search, feedback):
+    """One page of bookings from the server; filtering and paging happen in SQL."""
+    params = {"page": page, "page_size": page_size}
+    if search:
+        params["search"] = search
+    if feedback != "any":
+        params["feedback"] = feedback
+    response = requests.get(f"{BOOKINGS_API_URL}/bookings/page", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_changes(since):
+    response = requests.get(f"{BOOKINGS_API_URL}/bookings/changes", params={"since": since}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def refresh_if_changed():
+    """Drop the cached pages when bookings changed since the last rerun (cheap cursor read, no reload)."""
+    cursor = st.session_state.get("changes_cursor")
+    try:
+        if cursor is None:
+            st.session_state["changes_cursor"] = fetch_changes("now")["cursor"]
+            return
+        result = fetch_changes(cursor)
+        if result["has_more"]:
+            result["cursor"] = fetch_changes("now")["cursor"]
+    except requests.exceptions.RequestException:
+        return  # the page fetch below reports the server being down
+    st.session_state["changes_cursor"] = result["cursor"]
+    if result["changes"]:
+        fetch_bookings_page.clear()
+        st.toast(f"{len(result['changes'])}{'+' if result['has_more'] else ''} booking change(s), data refreshed")
+
+
+def start_calls(phone_numbers):
+    """Queue calls through the server's dialer; returns as soon as they are queued."""
+    response = requests.post(f"{BOOKINGS_API_URL}/outbound-calls", json={"phone_numbers": phone_numbers}, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_call_status(call_id):
+    response = requests.get(f"{BOOKINGS_API_URL}/outbound-calls/{call_id}", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def show_calls():
+    calls = st.session_state.get("calls", {})
+    if not calls:
+        return
+    st.subheader("Calls")
+    if st.button("Refresh call status", key="refresh-calls"):
+        for call_id in list(calls):
+            try:
+                calls[call_id] = fetch_call_status(call_id)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Error fetching call {call_id}: {e}")
+    st.dataframe(pd.DataFrame(list(calls.values()))[["phone_number", "status", "call_sid", "error", "updated_at"]],
+                 hide_index=True, use_container_width=True)
+
+
+def dial(phone_numbers):
     try:
-        url = "https://actually-liked-doe.ngrok-free.app/bookings"  # Replace with your API URL
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        result = start_calls(phone_numbers)
     except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching data: {e}")
-        return []
+        st.error(f"Error initiating calls: {e}")
+        return
+    calls = st.session_state.setdefault("calls", {})
+    for call in result["calls"]:
+        calls[call["id"]] = call
+    if result["calls"]:
+        st.success(f"{len(result['calls'])} call(s) queued.")
+    if result["rejected"]:
+        st.warning(f"Not allowed to call: {', '.join(result['rejected'])}")
 
 
 # Main Streamlit App
@@ -24,47 +96,44 @@ def main():
     st.set_page_config(page_title="Booking Management", layout="wide")
     st.title("Booking Management")
 
-    # Fetch data on app startup
-    bookings = fetch_bookings()
-
-    if bookings:
-        # Convert bookings to a DataFrame for better display
-        df = pd.DataFrame(bookings)
-
-        if not df.empty:
-            st.subheader("Bookings Data")
-            for _, row in df.iterrows():
-                # Create columns to layout booking details and the button
-                col1, col2, col3,col4 = st.columns([2, 4, 2,4])
-
-                with col1:
-                    st.write(f"**Booking ID**: {row.get('id', 'N/A')}")
-                    st.write(f"**Customer Name**: {row.get('customer_name', 'N/A')}")
-
-                with col2:
-                    st.write(f"**Phone Number**: {row.get('phone_number', 'N/A')}")
-                with col3:
-                    st.write(f"**Customer Feedack**: {row.get('feedback', 'N/A')}")
-
-                with col4:
-                    phone_number = row.get('phone_number', 'N/A')
-                    if phone_number != 'N/A':  # Ensure a valid phone number exists
-                        if st.button(f"Call {phone_number}", key=phone_number):
-                            with st.spinner(f"Initiating call to {phone_number}..."):
-                                try:
-                                    asyncio.run(make_call(phone_number))
-                                    st.success(f"Call successfully initiated to {phone_number}")
-                                except Exception as e:
-                                    st.error(f"Error initiating call to {phone_number}: {str(e)}")
-                    else:
-                        st.warning("No valid phone number to call.")
-
-                st.markdown("---")
-        else:
-            st.warning("No bookings found.")
-    else:
-        st.warning("Could not retrieve bookings data.")
+    with st.sidebar:
+        search = st.text_input("Search (name, phone or room)").strip()
+        feedback = st.selectbox("Feedback", ["any", "missing", "given"])
+        page = st.number_input("Page", min_value=1, value=1, step=1)
+        if st.button("Reload data"):
+            fetch_bookings_page.clear()
 
+    refresh_if_changed()
+    try:
+        data = fetch_bookings_page(int(page), PAGE_SIZE, search, feedback)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error fetching data: {e}")
+        return
+
+    bookings = data["items"]
+    if not bookings:
+        st.warning("No bookings found.")
+        show_calls()
+        return
+
+    total = data["total"]
+    st.caption(f"{total} booking(s), page {data['page']} of {-(-total // PAGE_SIZE)}")
+
+    # One table for the page; guests to call are ticked in its first column
+    df = pd.DataFrame(bookings)
+    df.insert(0, "call", False)
+    edited = st.data_editor(
+        df[["call", "id", "customer_name", "phone_number", "room_number", "check_in_date", "check_out_date",
+            "feedback"]],
+        disabled=["id", "customer_name", "phone_number", "room_number", "check_in_date", "check_out_date",
+                  "feedback"],
+        hide_index=True, use_container_width=True, key=f"bookings-{page}-{search}-{feedback}",
+    )
+    selected = list(edited.loc[edited["call"], "phone_number"].dropna().unique())
+    if st.button(f"Call {len(selected)} selected guest(s)", key="call-selected", disabled=not selected):
+        dial(selected)
+
+    show_calls()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# Benchmarks and load tests. Run the modules with `python -m benchmarks.<name>` from the repo root.
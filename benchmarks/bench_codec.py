@@ -0,0 +1,95 @@
+"""
+Throughput of agents.codec on 20 ms frames, the unit the media bridge works in.
+
+    python -m benchmarks.bench_codec
+    python -m benchmarks.bench_codec --baseline benchmarks/results/codec-<commit>.json
+
+Each case converts one frame per operation on a single thread. A stream produces 50
+frames per second in each direction, so the report turns throughput into the number
+of concurrent streams one core can convert (with the whole core spent on it).
+Results go to benchmarks/results/codec-<commit>.json; exits with 1 on a regression
+beyond --threshold against --baseline.
+"""
+import argparse
+import base64
+import os
+import sys
+
+import numpy as np
+
+from agents.codec import ulaw_to_pcm, pcm_to_ulaw, Resampler, normalize_gain, ulaw_to_pcm_rate, pcm_rate_to_ulaw
+from agents.vad import VoiceActivityDetector
+from benchmarks.runner import measure, save_results, load_results, find_regressions, print_table
+
+FRAMES_PER_SECOND = 50  # per stream and direction
+
+
+def frames(rate, count=500, seed=1):
+    """`count` frames of 20 ms speech-like PCM16 at `rate`."""
+    rng = np.random.default_rng(seed)
+    samples = rate // FRAMES_PER_SECOND
+    t = np.arange(samples * count) / rate
+    signal = 6000 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t)) / 2
+    signal += rng.normal(0, 300, signal.size)
+    return [chunk.astype(np.int16) for chunk in np.split(signal, count)]
+
+
+def codec_cases():
+    pcm_8k = frames(8000)
+    pcm_24k = frames(24000)
+    ulaw = [pcm_to_ulaw(frame) for frame in pcm_8k]
+    up_16k, up_24k, down_24k = Resampler(8000, 16000), Resampler(8000, 24000), Resampler(24000, 8000)
+    inbound, outbound = Resampler(8000, 24000), Resampler(24000, 8000)
+    vad = VoiceActivityDetector()
+    payloads = [base64.b64encode(frame).decode("ascii") for frame in ulaw]
+
+    def pick(items, i):
+        return items[i % len(items)]
+
+    return {
+        "ulaw -> pcm16": lambda i: ulaw_to_pcm(pick(ulaw, i)),
+        "pcm16 -> ulaw": lambda i: pcm_to_ulaw(pick(pcm_8k, i)),
+        "resample 8k -> 16k": lambda i: up_16k.process(pick(pcm_8k, i)),
+        "resample 8k -> 24k": lambda i: up_24k.process(pick(pcm_8k, i)),
+        "resample 24k -> 8k": lambda i: down_24k.process(pick(pcm_24k, i)),
+        "normalize gain": lambda i: normalize_gain(pick(pcm_8k, i)),
+        "vad frame": lambda i: vad.process(pick(payloads, i)),
+        # What a 24 kHz PCM provider would cost per frame: both directions of one stream
+        "bridge ulaw8k <-> pcm24k": lambda i: (ulaw_to_pcm_rate(pick(ulaw, i), 24000, inbound),
+                                               pcm_rate_to_ulaw(pick(pcm_24k, i), 24000, outbound)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio codec on 20 ms frames.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression, 0.15 = 15%%")
+    args = parser.parse_args()
+
+    results = {}
+    for name, operation in codec_cases().items():
+        print(f"  {name} ...")
+        results[name] = measure(operation, args.iterations, warmup=100)
+        throughput = results[name]["throughput_ops"] or 0
+        results[name]["streams_per_core"] = int(throughput / FRAMES_PER_SECOND)
+    print_table(results)
+    print(f"    {'case':<40} {'streams/core':>12}")
+    for name, result in results.items():
+        print(f"    {name:<40} {result['streams_per_core']:>12}")
+
+    path = save_results("codec", {"iterations": args.iterations, "results": results})
+    print(f"Results written to {os.path.relpath(path)}")
+
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline)["results"], args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regression beyond {args.threshold:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Cold import time and memory of the gateway's modules.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --compare-ref HEAD~1   # same measurement on another commit
+
+Each module is imported in a fresh interpreter (`python -X importtime`), --runs times;
+the report has the median wall time of the import, the interpreter's peak resident
+memory afterwards, the slowest imports from -X importtime, and which heavy packages
+(web UI, vector store, SDKs) the import dragged in. With --compare-ref the commit is
+checked out in a temporary git worktree and measured the same way. Results go to
+benchmarks/results/imports-<commit>.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.runner import save_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("main", "tools.tools", "tools.functioncalling", "outboundcall", "rag.kdb")
+# Packages the gateway should not load just by starting
+HEAVY_PACKAGES = ("streamlit", "chromadb", "tavily", "twilio.rest", "pandas", "pyarrow")
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr, top):
+    """The `top` slowest imports by self time from -X importtime output, as (module, self ms, cumulative ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def measure_import(module, root, runs, top):
+    env = dict(os.environ, PYTHONPATH=root)
+    samples = []
+    slowest = []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=root, env=env, capture_output=True, text=True)
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+            return {"error": error}
+        samples.append(json.loads(process.stdout.strip().splitlines()[-1]))
+        slowest = parse_importtime(process.stderr, top)
+    return {
+        "import_ms": round(statistics.median(sample["seconds"] for sample in samples) * 1000, 1),
+        "max_rss_mb": round(statistics.median(sample["max_rss_mb"] for sample in samples), 1),
+        "heavy_packages": samples[-1]["heavy"],
+        "slowest": [{"module": name, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+                    for name, self_ms, cumulative_ms in slowest],
+    }
+
+
+def measure_tree(root, modules, runs, top):
+    results = {}
+    for module in modules:
+        print(f"  import {module} ...")
+        results[module] = measure_import(module, root, runs, top)
+    return results
+
+
+def measure_ref(ref, modules, runs, top):
+    """Measure `ref` in a temporary detached worktree."""
+    worktree = tempfile.mkdtemp(prefix="bench-import-")
+    subprocess.run(["git", "worktree", "add", "--detach", "--force", worktree, ref], cwd=REPO_ROOT, check=True,
+                   capture_output=True)
+    try:
+        return measure_tree(worktree, modules, runs, top)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT, capture_output=True)
+
+
+def print_report(results, baseline=None):
+    print(f"    {'module':<28} {'import ms':>10} {'rss MB':>8}  heavy packages")
+    for module, result in results.items():
+        if "error" in result:
+            print(f"    {module:<28} error: {result['error']}")
+            continue
+        line = f"    {module:<28} {result['import_ms']:>10} {result['max_rss_mb']:>8}  {', '.join(result['heavy_packages']) or '-'}"
+        before = (baseline or {}).get(module)
+        if before and "error" not in before:
+            line += (f"   (was {before['import_ms']} ms, {before['max_rss_mb']} MB, "
+                     f"{', '.join(before['heavy_packages']) or '-'})")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time and memory of the gateway modules.")
+    parser.add_argument("--modules", default=",".join(MODULES), help="comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed per module")
+    parser.add_argument("--compare-ref", help="git ref to measure the same way, e.g. HEAD~1")
+    args = parser.parse_args()
+    modules = args.modules.split(",")
+
+    results = measure_tree(REPO_ROOT, modules, args.runs, args.top)
+    baseline = measure_ref(args.compare_ref, modules, args.runs, args.top) if args.compare_ref else None
+    print_report(results, baseline)
+    for module, result in results.items():
+        if result.get("slowest"):
+            print(f"  slowest imports under {module}:")
+            for row in result["slowest"]:
+                print(f"    {row['module']:<50} {row['self_ms']:>8.1f} ms self {row['cumulative_ms']:>9.1f} ms total")
+
+    path = save_results("imports", {"runs": args.runs, "compare_ref": args.compare_ref, "results": results,
+                                    "baseline": baseline})
+    print(f"Results written to {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
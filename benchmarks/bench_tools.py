@@ -0,0 +1,207 @@
+"""
+Benchmarks for the booking tools in tools.tools and the /bookings endpoint.
+
+Runs against the database in DATABASE_URL (a local Postgres, or a disposable one:
+`docker run --rm -p 5433:5432 -e POSTGRES_USER=agent -e POSTGRES_PASSWORD=booking
+-e POSTGRES_DB=Hotel_db postgres:15` with DATABASE_URL pointing at port 5433).
+
+    # benchmark whatever data is there
+    python -m benchmarks.bench_tools
+    # reseed the database at each scale first (destroys its data), compare with a baseline
+    python -m benchmarks.bench_tools --scales tiny,small,medium --reseed --baseline benchmarks/results/<file>.json
+
+Reports p50/p95/p99 latency and throughput per case, saves them to
+benchmarks/results/tools-<commit>.json and exits with 1 when a case regressed by
+more than --threshold against the baseline.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.runner import measure, save_results, load_results, find_regressions, print_table
+from tools.tools import DATABASE_URL, engine, get_available_rooms, book_room, alter_booking, get_customer_by_phone_number, \
+    find_booking_by_number, customer_cache
+
+# Bookings made by the benchmark land after this date so they never collide with seeded data
+BENCH_DATE = date(2100, 1, 1)
+
+
+def load_samples(rng, count=500):
+    """Random real values (areas, rooms, customers) to drive the cases."""
+    with engine.connect() as connection:
+        areas = [row[0] for row in connection.execute(text("SELECT DISTINCT area FROM hotels"))]
+        rooms = connection.execute(text(
+            "SELECT h.name, r.room_number FROM rooms r JOIN hotels h ON h.id = r.hotel_id "
+            "ORDER BY random() LIMIT :count"), {"count": count}).fetchall()
+        phones = [row[0] for row in connection.execute(text(
+            "SELECT c.phone_number FROM customers c WHERE c.phone_number IS NOT NULL "
+            "ORDER BY random() LIMIT :count"), {"count": count})]
+    if not (areas and rooms and phones):
+        sys.exit("The database needs hotels, rooms and customers; seed it with database/seed.py or use --reseed.")
+    rng.shuffle(phones)
+    return areas, rooms, phones
+
+
+def cleanup_bench_bookings():
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM bookings WHERE check_in_date >= :date"), {"date": BENCH_DATE})
+
+
+def tool_cases(rng, areas, rooms, phones):
+    """name -> operation(i) for every tool case."""
+    today = date.today()
+
+    def search_dates():
+        check_in = today + timedelta(days=rng.randint(1, 300))
+        return check_in, check_in + timedelta(days=rng.randint(1, 7))
+
+    def available_rooms(i):
+        check_in, check_out = search_dates()
+        get_available_rooms(check_in, check_out, rng.choice(areas))
+
+    def available_rooms_filtered(i):
+        check_in, check_out = search_dates()
+        get_available_rooms(check_in, check_out, rng.choice(areas), rng.choice(["Single", "Double", "Suite"]), 2)
+
+    def book(i):
+        hotel_name, room_number = rooms[i % len(rooms)]
+        # Warmup calls (i < 0) book well after the measured ones, never before BENCH_DATE
+        block = i // len(rooms) if i >= 0 else 1000 - i
+        check_in = BENCH_DATE + timedelta(days=block * 10 + rng.randint(0, 5))
+        result = book_room(hotel_name, room_number, phones[i % len(phones)], check_in, check_in + timedelta(days=2))
+        # book_room reports failures as a message; count them as errors, not as bookings
+        if "successfully booked" not in result:
+            raise RuntimeError(result)
+
+    booking_ids = []
+
+    def alter(i):
+        if not booking_ids:
+            with engine.connect() as connection:
+                booking_ids.extend(row[0] for row in connection.execute(
+                    text("SELECT id FROM bookings WHERE check_in_date >= :date"), {"date": BENCH_DATE}))
+            if not booking_ids:
+                raise RuntimeError("no benchmark bookings to alter, run book_room first")
+        new_check_in = BENCH_DATE + timedelta(days=3000 + rng.randint(0, 3000))
+        result = alter_booking(booking_ids[i % len(booking_ids)], new_check_in, new_check_in + timedelta(days=1))
+        if "successfully updated" not in result:
+            raise RuntimeError(result)
+
+    def customer_cold(i):
+        customer_cache.clear()
+        get_customer_by_phone_number(phones[i % len(phones)])
+
+    def customer_warm(i):
+        get_customer_by_phone_number(phones[i % len(phones)])
+
+    def find_bookings_cold(i):
+        customer_cache.clear()
+        find_booking_by_number(phones[i % len(phones)])
+
+    return {
+        "get_available_rooms": available_rooms,
+        "get_available_rooms[type,guests]": available_rooms_filtered,
+        "book_room": book,
+        "alter_booking": alter,
+        "get_customer_by_phone_number[cold]": customer_cold,
+        "get_customer_by_phone_number[warm]": customer_warm,
+        "find_booking_by_number[cold]": find_bookings_cold,
+    }
+
+
+def bookings_endpoint(base_url):
+    """GET /bookings through a running server, or in-process through the FastAPI test client."""
+    if base_url:
+        import httpx
+        client = httpx.Client(base_url=base_url, timeout=60)
+    else:
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+
+    def get_bookings(i):
+        response = client.get("/bookings")
+        if response.status_code not in (200, 404):
+            raise RuntimeError(f"/bookings returned {response.status_code}")
+
+    return get_bookings
+
+
+def run_scale(args, rng):
+    areas, rooms, phones = load_samples(rng)
+    results = {}
+    cleanup_bench_bookings()
+    try:
+        for name, operation in tool_cases(rng, areas, rooms, phones).items():
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            print(f"  {name} ...")
+            results[name] = measure(operation, args.iterations, args.concurrency)
+    finally:
+        cleanup_bench_bookings()
+    if not args.only or any(pattern in "GET /bookings" for pattern in args.only):
+        print("  GET /bookings ...")
+        results["GET /bookings"] = measure(bookings_endpoint(args.base_url), args.endpoint_iterations,
+                                           args.concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the booking tools and the /bookings endpoint.")
+    parser.add_argument("--scales", default="current",
+                        help="comma separated database/seed.py scales, or 'current' for the data already loaded")
+    parser.add_argument("--reseed", action="store_true",
+                        help="truncate and reseed the database for each scale (destroys its data)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--endpoint-iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="threads issuing operations in parallel")
+    parser.add_argument("--only", action="append", help="only run cases whose name contains this (repeatable)")
+    parser.add_argument("--base-url", help="benchmark /bookings on a running server instead of in-process")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression, 0.15 = 15%%")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scales = args.scales.split(",")
+    if args.reseed and "current" in scales:
+        sys.exit("--reseed needs named scales, e.g. --scales tiny,small")
+
+    report = {"iterations": args.iterations, "concurrency": args.concurrency, "scales": {}}
+    for scale in scales:
+        print(f"Scale {scale}")
+        if args.reseed:
+            import psycopg2
+            from database.seed import SCALES, seed_database
+            connection = psycopg2.connect(DATABASE_URL)
+            try:
+                seed_database(connection, truncate=True, defer_indexes=True, **SCALES[scale])
+            finally:
+                connection.close()
+            customer_cache.clear()
+        report["scales"][scale] = run_scale(args, rng)
+        print_table(report["scales"][scale])
+
+    path = save_results("tools", report)
+    print(f"Results written to {os.path.relpath(path)}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline)["scales"]
+        regressions = []
+        for scale, results in report["scales"].items():
+            regressions += [f"[{scale}] {line}" for line in find_regressions(results, baseline.get(scale, {}),
+                                                                          args.threshold)]
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regression beyond {args.threshold:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Local stand-in for the OpenAI Realtime API, used by benchmarks/loadtest.py.
+
+Speaks enough of the realtime protocol for agents.agent.handle_call: acknowledges
+session.update, answers every response.create with a stream of g711 µ-law audio
+deltas followed by response.done, and every `function_call_every`-th response
+ends with a scripted function call instead of audio. Like server_vad, it also
+starts a caller "turn" every `turn_interval` seconds (speech_started, then a new
+response), which keeps audio flowing and exercises the interruption path.
+
+Each audio delta carries time.monotonic_ns() in its first 8 bytes, and so do the
+frames sent by the fake Twilio clients, which is how relay latency is measured
+in both directions (both ends run in the load tester's process).
+"""
+import asyncio
+import base64
+import itertools
+import json
+import struct
+import time
+
+import websockets
+
+FRAME_BYTES = 160  # 20 ms of 8 kHz µ-law
+STAMP = struct.Struct("<q")
+
+
+def stamped_frame(filler=b"\xff"):
+    """A 20 ms µ-law frame whose first 8 bytes are the current monotonic time in ns."""
+    return STAMP.pack(time.monotonic_ns()) + filler * (FRAME_BYTES - STAMP.size)
+
+
+def frame_age_ms(frame):
+    """Milliseconds since a stamped_frame() was created, or None if the frame is too short."""
+    if len(frame) < STAMP.size:
+        return None
+    return (time.monotonic_ns() - STAMP.unpack_from(frame)[0]) / 1e6
+
+
+class FakeRealtimeServer:
+    def __init__(self, host="127.0.0.1", port=0, response_frames=100, delta_interval=0.02, turn_interval=5.0,
+                 function_call_every=3, function_name="hangup_function", function_arguments="{}"):
+        self.host = host
+        self.port = port
+        self.response_frames = response_frames
+        self.delta_interval = delta_interval
+        self.turn_interval = turn_interval
+        self.function_call_every = function_call_every
+        self.function_name = function_name
+        self.function_arguments = function_arguments
+        self.inbound_latencies_ms = []
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.sessions = 0
+        self.function_calls = 0
+        self._ids = itertools.count(1)
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v1/realtime"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset_stats(self):
+        self.inbound_latencies_ms = []
+        self.frames_received = 0
+        self.frames_sent = 0
+
+    async def _handle(self, websocket, path=None):
+        self.sessions += 1
+        state = {"responses": 0, "responding": None}
+        turns = None
+        try:
+            async for message in websocket:
+                event = json.loads(message)
+                event_type = event.get("type")
+                if event_type == "input_audio_buffer.append":
+                    self.frames_received += 1
+                    age = frame_age_ms(base64.b64decode(event["audio"]))
+                    if age is not None:
+                        self.inbound_latencies_ms.append(age)
+                elif event_type == "session.update":
+                    await websocket.send(json.dumps({"type": "session.updated", "session": event.get("session", {})}))
+                    if turns is None and self.turn_interval:
+                        turns = asyncio.create_task(self._caller_turns(websocket, state))
+                elif event_type == "response.create":
+                    self._start_response(websocket, state)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if turns:
+                turns.cancel()
+            if state["responding"]:
+                state["responding"].cancel()
+
+    def _start_response(self, websocket, state):
+        state["responses"] += 1
+        if state["responding"] and not state["responding"].done():
+            state["responding"].cancel()
+        state["responding"] = asyncio.create_task(self._respond(websocket, state["responses"]))
+
+    async def _caller_turns(self, websocket, state):
+        """Pretend the caller speaks every turn_interval seconds, as server_vad would report it."""
+        try:
+            while True:
+                await asyncio.sleep(self.turn_interval)
+                item_id = f"item_{next(self._ids)}"
+                await websocket.send(json.dumps({"type": "input_audio_buffer.speech_started", "item_id": item_id}))
+                await websocket.send(json.dumps({"type": "input_audio_buffer.speech_stopped", "item_id": item_id}))
+                await websocket.send(json.dumps({"type": "input_audio_buffer.committed", "item_id": item_id}))
+                self._start_response(websocket, state)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _respond(self, websocket, number):
+        response_id = f"resp_{next(self._ids)}"
+        item_id = f"item_{next(self._ids)}"
+        if self.function_call_every and number % self.function_call_every == 0:
+            self.function_calls += 1
+            output = [{
+                "type": "function_call",
+                "name": self.function_name,
+                "arguments": self.function_arguments,
+                "call_id": f"call_{next(self._ids)}",
+            }]
+        else:
+            for _ in range(self.response_frames):
+                await websocket.send(json.dumps({
+                    "type": "response.audio.delta",
+                    "response_id": response_id,
+                    "item_id": item_id,
+                    "delta": base64.b64encode(stamped_frame(b"\x7f")).decode("ascii"),
+                }))
+                self.frames_sent += 1
+                await asyncio.sleep(self.delta_interval)
+            output = [{"type": "message", "id": item_id, "role": "assistant",
+                       "content": [{"type": "audio", "transcript": "Fake assistant reply."}]}]
+        await websocket.send(json.dumps({
+            "type": "response.done",
+            "response": {"id": response_id, "status": "completed", "output": output},
+        }))
+
+
+if __name__ == "__main__":
+    async def serve_forever():
+        server = await FakeRealtimeServer(port=8765).start()
+        print(f"Fake realtime server listening on {server.url}")
+        await asyncio.Future()
+
+    asyncio.run(serve_forever())
@@ -0,0 +1,324 @@
+"""
+End-to-end load test of the voice pipeline: fake Twilio callers -> main.py -> fake Realtime API.
+
+Starts benchmarks.fake_realtime.FakeRealtimeServer in this process and a `uvicorn main:app`
+gateway with OPENAI_REALTIME_URL pointing at it (or uses --gateway-url, in which case the
+gateway must already be configured that way). Each simulated call opens
+/media-stream/{number}, sends Twilio's connected/start events, then 20 ms µ-law frames at
+50 fps, and answers the bridge's marks like Twilio does once audio is played.
+
+The number of concurrent calls is ramped in steps. For each step it reports:
+  - relay latency in both directions (frames are stamped with their send time),
+  - frame loss in both directions,
+  - event-loop lag of the gateway, from its /debug/loop monitor (the gateway we start runs with
+    LOOP_DIAGNOSTICS=1), plus the round trip of GET / as seen by a client,
+  - gateway CPU per call (from /proc/<pid>/stat, when the gateway runs as our subprocess),
+and stops at the first step breaking a threshold. The last passing step is the max
+sustainable call count.
+
+    python -m benchmarks.loadtest --steps 10,25,50,100,200 --duration 30
+
+The gateway still loads the caller's profile on connect, so DATABASE_URL must reach a database.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+
+from benchmarks.fake_realtime import FakeRealtimeServer, stamped_frame, frame_age_ms
+from benchmarks.runner import percentile, save_results
+
+FRAME_INTERVAL = 0.02  # Twilio sends one 20 ms frame at a time
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class StepStats:
+    """Everything the callers record during one step; only counted while `recording`."""
+
+    def __init__(self):
+        self.recording = False
+        self.outbound_latencies_ms = []
+        self.send_delays_ms = []
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.clears = 0
+        self.errors = 0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gateway(port, realtime_url):
+    env = dict(os.environ, OPENAI_REALTIME_URL=realtime_url, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "fake"),
+               LOOP_DIAGNOSTICS="1", GREETING_CACHE="0")  # cached greetings would skew the outbound latency
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL)
+
+
+async def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"gateway at {base_url} did not come up within {timeout}s")
+
+
+async def loop_diagnostics(base_url, reset=False):
+    """The gateway's /debug/loop snapshot (or reset it), None when diagnostics are disabled there."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        response = await (client.post("/debug/loop/reset") if reset else client.get("/debug/loop"))
+    return response.json() if response.status_code == 200 else None
+
+
+def cpu_seconds(pid):
+    """utime + stime of a process, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+async def fake_call(ws_url, number, stats, stop):
+    """One Twilio media stream: stamped frames out at 50 fps, relayed audio in."""
+    stream_sid = f"MZ{number}"
+    try:
+        async with websockets.connect(f"{ws_url}/media-stream/{number}", max_size=None) as websocket:
+            await websocket.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+            await websocket.send(json.dumps({"event": "start", "sequenceNumber": "1", "streamSid": stream_sid,
+                                             "start": {"streamSid": stream_sid, "callSid": f"CA{number}",
+                                                       "mediaFormat": {"encoding": "audio/x-mulaw",
+                                                                       "sampleRate": 8000, "channels": 1}}}))
+
+            async def receive():
+                async for message in websocket:
+                    data = json.loads(message)
+                    if data["event"] == "media":
+                        age = frame_age_ms(base64.b64decode(data["media"]["payload"]))
+                        if stats.recording:
+                            stats.frames_received += 1
+                            if age is not None:
+                                stats.outbound_latencies_ms.append(age)
+                    elif data["event"] == "mark":
+                        # Twilio echoes a mark once the audio before it has been played
+                        await websocket.send(json.dumps({"event": "mark", "streamSid": stream_sid,
+                                                         "mark": data["mark"]}))
+                    elif data["event"] == "clear" and stats.recording:
+                        stats.clears += 1
+
+            receiver = asyncio.create_task(receive())
+            started = time.monotonic()
+            sent = 0
+            try:
+                while not stop.is_set() and not receiver.done():
+                    # Absolute schedule, so a late frame does not push every later one back
+                    due = started + sent * FRAME_INTERVAL
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif stats.recording:
+                        stats.send_delays_ms.append(-delay * 1000)
+                    sent += 1
+                    await websocket.send(json.dumps({
+                        "event": "media", "streamSid": stream_sid,
+                        "media": {"track": "inbound", "chunk": str(sent), "timestamp": str(sent * 20),
+                                  "payload": base64.b64encode(stamped_frame()).decode("ascii")},
+                    }))
+                    if stats.recording:
+                        stats.frames_sent += 1
+                await websocket.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+            finally:
+                receiver.cancel()
+    except (OSError, websockets.WebSocketException) as e:
+        stats.errors += 1
+        if stats.errors == 1:
+            print(f"    first call error: {e!r}")
+
+
+async def probe_loop_lag(base_url, stats, stop, interval=0.1):
+    """GET / round trips; the handler is trivial, so the time is mostly waiting for the gateway's loop."""
+    lags = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                await client.get("/")
+            except httpx.HTTPError:
+                stats.errors += 1
+            if stats.recording:
+                lags.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(interval)
+    return lags
+
+
+def latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    return {"p50_ms": round(percentile(values, 50), 2), "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2), "max_ms": round(values[-1], 2)}
+
+
+def loss(sent, received):
+    return round(max(sent - received, 0) / sent, 4) if sent else None
+
+
+async def run_step(calls, args, fake, base_url, gateway_pid):
+    stats = StepStats()
+    stop = asyncio.Event()
+    ws_url = base_url.replace("http", "ws", 1)
+    lag_probe = asyncio.create_task(probe_loop_lag(base_url, stats, stop))
+    tasks = []
+    for i in range(calls):
+        tasks.append(asyncio.create_task(fake_call(ws_url, f"+1555{i:07d}", stats, stop)))
+        await asyncio.sleep(args.ramp / calls)
+    await asyncio.sleep(args.warmup)
+
+    fake.reset_stats()
+    await loop_diagnostics(base_url, reset=True)
+    cpu_before = cpu_seconds(gateway_pid) if gateway_pid else None
+    stats.recording = True
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+    stats.recording = False
+    elapsed = time.monotonic() - started
+    cpu_after = cpu_seconds(gateway_pid) if gateway_pid else None
+    inbound_sent, inbound_received = stats.frames_sent, fake.frames_received
+    outbound_sent, outbound_received = fake.frames_sent, stats.frames_received
+    inbound_latencies = list(fake.inbound_latencies_ms)
+    gateway_loop = await loop_diagnostics(base_url)
+
+    stop.set()
+    await asyncio.gather(*tasks)
+    lags = await lag_probe
+
+    cpu = None
+    if cpu_before is not None and cpu_after is not None:
+        cpu = round((cpu_after - cpu_before) / elapsed, 3)
+    return {
+        "calls": calls,
+        "inbound_relay": latency_summary(inbound_latencies),
+        "outbound_relay": latency_summary(stats.outbound_latencies_ms),
+        "loop_lag": gateway_loop["lag"] if gateway_loop else latency_summary(lags),
+        "probe_round_trip": latency_summary(lags),
+        "slow_callbacks": gateway_loop["slow_callback_count"] if gateway_loop else None,
+        "slowest_callback": max(gateway_loop["slow_callbacks"], key=lambda record: record["blocked_ms"],
+                                default=None) if gateway_loop else None,
+        "inbound_frame_loss": loss(inbound_sent, inbound_received),
+        "outbound_frame_loss": loss(outbound_sent, outbound_received),
+        "cpu_cores": cpu,
+        "cpu_per_call": round(cpu / calls, 4) if cpu is not None else None,
+        "late_sends_p99_ms": latency_summary(stats.send_delays_ms)["p99_ms"],
+        "clears": stats.clears,
+        "errors": stats.errors,
+    }
+
+
+def violations(result, args):
+    """Thresholds a step broke; empty when the step is sustainable."""
+    broken = []
+    for direction in ("inbound_relay", "outbound_relay"):
+        p95 = result[direction]["p95_ms"]
+        if p95 is None or p95 > args.max_relay_p95_ms:
+            broken.append(f"{direction} p95 {p95}ms")
+    lag = result["loop_lag"]["p95_ms"]
+    if lag is not None and lag > args.max_lag_p95_ms:
+        broken.append(f"loop lag p95 {lag}ms")
+    for direction in ("inbound_frame_loss", "outbound_frame_loss"):
+        if result[direction] is not None and result[direction] > args.max_frame_loss:
+            broken.append(f"{direction} {result[direction]:.2%}")
+    if result["errors"]:
+        broken.append(f"{result['errors']} errors")
+    return broken
+
+
+def print_step(result):
+    print(f"    relay in  p50/p95/p99 {result['inbound_relay']['p50_ms']}/{result['inbound_relay']['p95_ms']}/"
+          f"{result['inbound_relay']['p99_ms']} ms, loss {result['inbound_frame_loss']}")
+    print(f"    relay out p50/p95/p99 {result['outbound_relay']['p50_ms']}/{result['outbound_relay']['p95_ms']}/"
+          f"{result['outbound_relay']['p99_ms']} ms, loss {result['outbound_frame_loss']}")
+    print(f"    loop lag  p50/p95/max {result['loop_lag']['p50_ms']}/{result['loop_lag']['p95_ms']}/"
+          f"{result['loop_lag']['max_ms']} ms, slow callbacks {result['slow_callbacks']}")
+    if result["slowest_callback"] and result["slowest_callback"]["stack"]:
+        print(f"    slowest callback {result['slowest_callback']['blocked_ms']}ms at "
+              f"{result['slowest_callback']['stack'][-1].splitlines()[0].strip()}")
+    print(f"    cpu {result['cpu_cores']} cores, {result['cpu_per_call']} per call, errors {result['errors']}")
+    if result["late_sends_p99_ms"] and result["late_sends_p99_ms"] > 20:
+        print(f"    warning: the load generator itself sent frames up to {result['late_sends_p99_ms']}ms late")
+
+
+async def run(args):
+    fake = await FakeRealtimeServer(response_frames=args.response_frames, turn_interval=args.turn_interval,
+                                    function_call_every=args.function_call_every).start()
+    gateway = None
+    base_url = args.gateway_url
+    if not base_url:
+        port = free_port()
+        gateway = start_gateway(port, fake.url)
+        base_url = f"http://127.0.0.1:{port}"
+    report = {"duration": args.duration, "steps": [], "max_sustainable_calls": 0}
+    try:
+        await wait_until_up(base_url)
+        for calls in args.steps:
+            print(f"{calls} concurrent calls ...")
+            result = await run_step(calls, args, fake, base_url, gateway.pid if gateway else args.gateway_pid)
+            result["violations"] = violations(result, args)
+            report["steps"].append(result)
+            print_step(result)
+            if result["violations"]:
+                print(f"    not sustainable: {', '.join(result['violations'])}")
+                break
+            report["max_sustainable_calls"] = calls
+    finally:
+        if gateway:
+            gateway.terminate()
+            gateway.wait()
+        await fake.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many concurrent calls one main.py process sustains.")
+    parser.add_argument("--steps", default="5,10,25,50,100,200",
+                        type=lambda value: [int(step) for step in value.split(",")],
+                        help="comma separated concurrent call counts, tried in order")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds after the last call connects")
+    parser.add_argument("--ramp", type=float, default=2, help="seconds over which the calls of a step connect")
+    parser.add_argument("--gateway-url", help="use a running gateway (started with OPENAI_REALTIME_URL set)")
+    parser.add_argument("--gateway-pid", type=int, help="pid of that gateway, for CPU figures")
+    parser.add_argument("--response-frames", type=int, default=100, help="audio frames per fake response")
+    parser.add_argument("--turn-interval", type=float, default=5, help="seconds between fake caller turns")
+    parser.add_argument("--function-call-every", type=int, default=3,
+                        help="every Nth fake response is a function call (0 for never)")
+    parser.add_argument("--max-relay-p95-ms", type=float, default=100)
+    parser.add_argument("--max-lag-p95-ms", type=float, default=50)
+    parser.add_argument("--max-frame-loss", type=float, default=0.01)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"Max sustainable concurrent calls: {report['max_sustainable_calls']}")
+    path = save_results("loadtest", report)
+    print(f"Results written to {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Timing, percentile and result-file helpers shared by the benchmarks."""
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values, q):
+    """q-th percentile (0-100) of an already sorted list, with linear interpolation."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Latency percentiles in milliseconds and throughput in operations per second."""
+    latencies = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        "throughput_ops": round(len(latencies) / elapsed, 2) if elapsed else None,
+    }
+
+
+def measure(operation, iterations, concurrency=1, warmup=5):
+    """
+    Call operation(i) `iterations` times from `concurrency` threads and summarize.
+    Exceptions are counted as errors and not timed.
+    """
+    for i in range(warmup):
+        try:
+            operation(-1 - i)
+        except Exception:
+            pass
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            operation(i)
+        except Exception as e:
+            with lock:
+                errors += 1
+                if errors == 1:
+                    print(f"    first error: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(iterations):
+            run(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run, range(iterations)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(name, report, directory=RESULTS_DIR):
+    """Write a report as <directory>/<name>-<commit>.json and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    report = {"commit": git_commit(), "timestamp": datetime.utcnow().isoformat(timespec="seconds"), **report}
+    path = os.path.join(directory, f"{name}-{report['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_regressions(current, baseline, threshold):
+    """
+    Compare two {case: summary} dicts. A case regresses when its p95 grows or its
+    throughput drops by more than `threshold` (0.1 = 10%).
+    """
+    regressions = []
+    for case, result in current.items():
+        before = baseline.get(case)
+        if not before:
+            continue
+        if result.get("p95_ms") and before.get("p95_ms") and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{case}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if (result.get("throughput_ops") and before.get("throughput_ops")
+                and result["throughput_ops"] < before["throughput_ops"] * (1 - threshold)):
+            regressions.append(f"{case}: throughput {before['throughput_ops']} -> {result['throughput_ops']} ops/s")
+    return regressions
+
+
+def print_table(results):
+    print(f"    {'case':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'errors':>7}")
+    for case, result in results.items():
+        print(f"    {case:<40} {result['p50_ms'] or '-':>9} {result['p95_ms'] or '-':>9} {result['p99_ms'] or '-':>9} "
+              f"{result['throughput_ops'] or '-':>10} {result['errors']:>7}")
@@ -0,0 +1,165 @@
+"""
+EXPLAIN-based regression check for the hot queries in tools.tools.
+
+Runs EXPLAIN (FORMAT JSON) on the queries the voice agent issues on every call and
+fails if any of them scans a hot table sequentially. With --seed, the database is
+first filled up to the requested scale (default: one million bookings) so the
+planner makes the same choices it would in production.
+
+    python database/check_indexes.py --seed --bookings 1000000
+
+Exit code 0 when every query uses its indexes, 1 otherwise. This is a manual check
+run against a database (DATABASE_URL), not part of an automated test suite.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.tools import engine, get_session, available_rooms_query, overlapping_bookings_query, \
+    customer_profile_query, Booking
+
+HOT_TABLES = ("hotels", "rooms", "bookings", "customers")
+
+SEED_SQL = """
+INSERT INTO hotels (name, area)
+SELECT 'Check Hotel ' || g, 'Check Area ' || (g %% 200)
+FROM generate_series(1, %(hotels)s) g
+ON CONFLICT (name) DO NOTHING;
+
+WITH ids AS (SELECT array_agg(id) AS hotels FROM hotels)
+INSERT INTO rooms (room_number, room_type, is_available, price_per_night, max_guests, hotel_id)
+SELECT 'C' || g, (ARRAY['Single', 'Double', 'Suite', 'Deluxe'])[1 + g %% 4], TRUE, 50 + g %% 250, 1 + g %% 5,
+       hotels[1 + g %% array_length(hotels, 1)]
+FROM ids, generate_series(1, %(rooms)s) g
+ON CONFLICT (room_number) DO NOTHING;
+
+INSERT INTO customers (phone_number, name)
+SELECT '+1999' || lpad(g::text, 10, '0'), 'Check Customer ' || g
+FROM generate_series(1, %(customers)s) g
+ON CONFLICT (phone_number) DO NOTHING;
+
+WITH ids AS (
+    SELECT array_agg(id) AS rooms, (SELECT array_agg(id) FROM customers) AS customers FROM rooms
+)
+INSERT INTO bookings (customer_id, room_id, check_in_date, check_out_date, feedback)
+SELECT customers[1 + floor(random() * array_length(customers, 1))::int],
+       rooms[1 + floor(random() * array_length(rooms, 1))::int],
+       d, d + 1 + floor(random() * 7)::int,
+       CASE WHEN random() < 0.8 THEN 'ok' END
+FROM ids, generate_series(1, %(bookings)s) g,
+     LATERAL (SELECT CURRENT_DATE - 365 + floor(random() * 730)::int + g * 0 AS d) dates;
+
+ANALYZE hotels;
+ANALYZE rooms;
+ANALYZE customers;
+ANALYZE bookings;
+"""
+
+
+def seed(connection, bookings):
+    """Top the tables up to the requested scale with throw-away rows."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT count(*) FROM bookings")
+    missing = bookings - cursor.fetchone()[0]
+    if missing <= 0:
+        print(f"bookings already has at least {bookings} rows, not seeding.")
+        return
+    params = {
+        "hotels": max(bookings // 1000, 10),
+        "rooms": max(bookings // 20, 100),
+        "customers": max(bookings // 4, 100),
+        "bookings": missing,
+    }
+    print(f"Seeding {params} ...")
+    cursor.execute(SEED_SQL, params)
+    connection.commit()
+    cursor.close()
+
+
+def sample_values(connection):
+    """Real values from the data so the planner sees realistic selectivity."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT area FROM hotels GROUP BY area ORDER BY count(*) DESC LIMIT 1")
+    area = cursor.fetchone()[0]
+    cursor.execute("SELECT room_id FROM bookings ORDER BY id DESC LIMIT 1")
+    room_id = cursor.fetchone()[0]
+    cursor.execute("SELECT phone_number FROM customers WHERE phone_number IS NOT NULL ORDER BY id DESC LIMIT 1")
+    phone_number = cursor.fetchone()[0]
+    cursor.close()
+    return area, room_id, phone_number
+
+
+def hot_queries(area, room_id, phone_number):
+    """(label, SQLAlchemy query) for every hot path."""
+    session = get_session()
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=3)
+    return [
+        ("available rooms", available_rooms_query(session, check_in, check_out, area)),
+        ("available rooms by type", available_rooms_query(session, check_in, check_out, area, "Double", 2)),
+        ("overlap check", overlapping_bookings_query(session, room_id, check_in, check_out)),
+        ("customer profile", customer_profile_query(session, phone_number)),
+        ("bookings without feedback", session.query(Booking.id).filter(
+            Booking.feedback == None, Booking.check_out_date >= date.today() - timedelta(days=7),
+            Booking.check_out_date < date.today())),
+    ]
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(connection, query):
+    compiled = query.statement.compile(dialect=engine.dialect)
+    cursor = connection.cursor()
+    cursor.execute("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+    plan = cursor.fetchone()[0]
+    cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def check(connection):
+    failures = 0
+    for label, query in hot_queries(*sample_values(connection)):
+        nodes = list(plan_nodes(explain(connection, query)))
+        scans = [(node["Node Type"], node.get("Relation Name"), node.get("Index Name"))
+                 for node in nodes if node.get("Relation Name") in HOT_TABLES]
+        sequential = [relation for node_type, relation, _ in scans if node_type == "Seq Scan"]
+        status = "FAIL" if sequential else "ok"
+        print(f"[{status}] {label}")
+        for node_type, relation, index in scans:
+            print(f"    {node_type} on {relation}" + (f" using {index}" if index else ""))
+        if sequential:
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the tools.tools queries use index scans.")
+    parser.add_argument("--seed", action="store_true", help="fill the database up to --bookings rows first")
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    connection = engine.raw_connection()
+    try:
+        if args.seed:
+            seed(connection, args.bookings)
+        failures = check(connection)
+    finally:
+        connection.close()
+    if failures:
+        print(f"{failures} query plan(s) fall back to sequential scans.")
+        sys.exit(1)
+    print("All hot queries use index scans.")
+
+
+if __name__ == "__main__":
+    main()
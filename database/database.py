@@ -1,6 +1,12 @@
+import os
+import sys
+
 import psycopg2
 from psycopg2.errors import DuplicateTable, UniqueViolation
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from migrate import apply_migrations
+
 # Database connection parameters
 DB_HOST = "localhost"
 DB_PORT = 5432
@@ -8,48 +14,6 @@ DB_NAME = "Hotel_db"
 DB_USER = "agent"
 DB_PASSWORD = "booking"
 
-def create_tables():
-    # SQL commands to drop and create tables
-    create_table_query = """
-    DROP TABLE IF EXISTS bookings CASCADE;
-    DROP TABLE IF EXISTS rooms CASCADE;
-    DROP TABLE IF EXISTS hotels CASCADE;
-    DROP TABLE IF EXISTS customers CASCADE;
-
-    CREATE TABLE IF NOT EXISTS hotels (
-        id SERIAL PRIMARY KEY,
-        name VARCHAR(100) NOT NULL UNIQUE,
-        area VARCHAR(100) NOT NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS rooms (
-        id SERIAL PRIMARY KEY,
-        room_number VARCHAR(10) NOT NULL UNIQUE,
-        room_type VARCHAR(50) NOT NULL,
-        is_available BOOLEAN NOT NULL DEFAULT TRUE,
-        price_per_night NUMERIC(10, 2) NOT NULL,
-        max_guests INTEGER NOT NULL,
-        hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE
-    );
-
-    CREATE TABLE IF NOT EXISTS customers (
-        id SERIAL PRIMARY KEY,
-        phone_number VARCHAR(15) UNIQUE,
-        name VARCHAR(100) NOT NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS bookings (
-        id SERIAL PRIMARY KEY,
-        customer_id INTEGER NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
-        check_in_date DATE NOT NULL,
-        check_out_date DATE NOT NULL,
-        feedback TEXT,
-        room_id INTEGER NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """
-    return create_table_query
-
 def populate_hotels():
     # Parameterized sample data query for hotels
     sample_hotels_query = """
@@ -156,10 +120,10 @@ def create_and_populate_tables():
         connection.autocommit = True
         cursor = connection.cursor()
 
-        # Execute table creation
-        print("Creating tables...")
-        cursor.execute(create_tables())
-        print("Tables created successfully.")
+        # Create or upgrade the schema; existing data is kept
+        print("Applying migrations...")
+        apply_migrations(connection)
+        print("Schema is up to date.")
 
         # Insert sample hotels data
         print("Inserting sample data into hotels table...")
@@ -173,11 +137,7 @@ def create_and_populate_tables():
         cursor.executemany(room_query, rooms_data)
         print("Rooms data inserted successfully.")
 
-        # Insert sample bookings data
-        print("Inserting sample data into bookings table...")
-        booking_query, bookings_data = populate_rooms()
-        cursor.executemany(booking_query, bookings_data)
-        print("Bookings data inserted successfully.")
+        # Bookings are not part of the sample data; generate them with database/seed.py
 
     except DuplicateTable as dt_err:
         print("Table already exists:", dt_err)
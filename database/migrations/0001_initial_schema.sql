@@ -0,0 +1,32 @@
+-- Initial schema, as previously created by database.create_tables (without the DROP TABLEs).
+CREATE TABLE IF NOT EXISTS hotels (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    area VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rooms (
+    id SERIAL PRIMARY KEY,
+    room_number VARCHAR(10) NOT NULL UNIQUE,
+    room_type VARCHAR(50) NOT NULL,
+    is_available BOOLEAN NOT NULL DEFAULT TRUE,
+    price_per_night NUMERIC(10, 2) NOT NULL,
+    max_guests INTEGER NOT NULL,
+    hotel_id INTEGER NOT NULL REFERENCES hotels(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS customers (
+    id SERIAL PRIMARY KEY,
+    phone_number VARCHAR(15) UNIQUE,
+    name VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id SERIAL PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+    check_in_date DATE NOT NULL,
+    check_out_date DATE NOT NULL,
+    feedback TEXT,
+    room_id INTEGER NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,20 @@
+-- migrate: no-transaction
+-- Indexes for the queries in tools.tools. Built CONCURRENTLY so live tables are not locked for writes,
+-- which cannot run inside a transaction, hence the marker above.
+
+-- Overlap checks and the availability anti-join: bookings of a room by date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_room_dates_idx ON bookings (room_id, check_in_date, check_out_date);
+
+-- Customer profile and find_booking_by_number
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_customer_id_idx ON bookings (customer_id);
+
+-- Availability search: rooms of the area's hotels filtered by type and capacity
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rooms_hotel_type_guests_idx ON rooms (hotel_id, room_type, max_guests);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS hotels_area_idx ON hotels (area);
+
+-- Feedback calls: past stays that have no feedback yet
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_without_feedback_idx ON bookings (check_out_date) WHERE feedback IS NULL;
+
+ANALYZE hotels;
+ANALYZE rooms;
+ANALYZE bookings;
@@ -0,0 +1,31 @@
+-- Call records written by agents.calllog: one row per call, and its transcript,
+-- tool invocations and lifecycle events in call_events. Ids are generated by the
+-- writer (uuid4) so rows can be batched without a round trip for RETURNING id.
+CREATE TABLE IF NOT EXISTS calls (
+    id UUID PRIMARY KEY,
+    direction VARCHAR(10) NOT NULL,
+    phone_number VARCHAR(15),
+    stream_sid VARCHAR(64),
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP,
+    duration_ms INTEGER,
+    outcome VARCHAR(30)
+);
+
+CREATE INDEX IF NOT EXISTS calls_phone_number_idx ON calls (phone_number, started_at);
+CREATE INDEX IF NOT EXISTS calls_started_at_idx ON calls (started_at);
+
+CREATE TABLE IF NOT EXISTS call_events (
+    id BIGSERIAL PRIMARY KEY,
+    call_id UUID NOT NULL REFERENCES calls(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    occurred_at TIMESTAMP NOT NULL,
+    event_type VARCHAR(30) NOT NULL,
+    role VARCHAR(20),
+    content TEXT,
+    tool_name VARCHAR(100),
+    latency_ms INTEGER,
+    data JSONB
+);
+
+CREATE INDEX IF NOT EXISTS call_events_call_seq_idx ON call_events (call_id, seq);
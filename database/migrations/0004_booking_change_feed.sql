@@ -0,0 +1,58 @@
+-- Change feed for bookings (GET /bookings/changes, GET /bookings/stream).
+-- Every insert/update stamps the row with the writing transaction's id, and deletes
+-- leave a tombstone stamped the same way. A reader that remembers the oldest
+-- transaction still running when it last read (txid_snapshot_xmin) can then ask for
+-- exactly the rows committed since, even when transactions commit out of order.
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS change_txid BIGINT NOT NULL DEFAULT txid_current();
+
+CREATE INDEX IF NOT EXISTS bookings_change_txid_idx ON bookings (change_txid, id);
+
+CREATE TABLE IF NOT EXISTS booking_tombstones (
+    booking_id INTEGER PRIMARY KEY,
+    change_txid BIGINT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS booking_tombstones_change_txid_idx ON booking_tombstones (change_txid, booking_id);
+
+CREATE OR REPLACE FUNCTION bookings_stamp_change() RETURNS trigger AS $$
+BEGIN
+    NEW.change_txid := txid_current();
+    IF TG_OP = 'UPDATE' THEN
+        NEW.version := OLD.version + 1;
+        NEW.updated_at := CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bookings_record_delete() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO booking_tombstones (booking_id, change_txid) VALUES (OLD.id, txid_current())
+    ON CONFLICT (booking_id) DO UPDATE SET change_txid = EXCLUDED.change_txid, deleted_at = CURRENT_TIMESTAMP;
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+
+-- One notification per statement, not per row: listeners only use it as a wake-up
+-- and read the changes themselves, so bulk loads do not flood the notify queue.
+CREATE OR REPLACE FUNCTION bookings_notify_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('booking_changes', TG_OP);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bookings_stamp_change ON bookings;
+CREATE TRIGGER bookings_stamp_change BEFORE INSERT OR UPDATE ON bookings
+    FOR EACH ROW EXECUTE FUNCTION bookings_stamp_change();
+
+DROP TRIGGER IF EXISTS bookings_record_delete ON bookings;
+CREATE TRIGGER bookings_record_delete AFTER DELETE ON bookings
+    FOR EACH ROW EXECUTE FUNCTION bookings_record_delete();
+
+DROP TRIGGER IF EXISTS bookings_notify_change ON bookings;
+CREATE TRIGGER bookings_notify_change AFTER INSERT OR UPDATE OR DELETE ON bookings
+    FOR EACH STATEMENT EXECUTE FUNCTION bookings_notify_change();
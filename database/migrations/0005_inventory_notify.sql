@@ -0,0 +1,19 @@
+-- Wake-up for caches of the hotel inventory (the hotel directory in the system prompt,
+-- tools.tools.hotel_directory). Changes to hotels, or to the room columns the directory
+-- shows, notify the inventory_changes channel once per statement; bookings do not.
+CREATE OR REPLACE FUNCTION inventory_notify_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('inventory_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS hotels_notify_change ON hotels;
+CREATE TRIGGER hotels_notify_change AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON hotels
+    FOR EACH STATEMENT EXECUTE FUNCTION inventory_notify_change();
+
+DROP TRIGGER IF EXISTS rooms_notify_change ON rooms;
+CREATE TRIGGER rooms_notify_change
+    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF room_type, is_available, price_per_night, max_guests, hotel_id
+    ON rooms
+    FOR EACH STATEMENT EXECUTE FUNCTION inventory_notify_change();
@@ -0,0 +1,19 @@
+-- Tentative holds on the rooms offered to a caller (tools.tools.hold_rooms), so they are
+-- not taken while the caller confirms. hold_key identifies the call; a hold counts only
+-- until expires_at, and expired rows are deleted in bulk by the sweeper in main.py.
+CREATE TABLE IF NOT EXISTS room_holds (
+    id BIGSERIAL PRIMARY KEY,
+    room_id INTEGER NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+    hold_key VARCHAR(64) NOT NULL,
+    check_in_date DATE NOT NULL,
+    check_out_date DATE NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    UNIQUE (room_id, hold_key, check_in_date, check_out_date)
+);
+
+-- Availability and booking checks: holds on a room overlapping a period
+CREATE INDEX IF NOT EXISTS room_holds_room_dates_idx ON room_holds (room_id, check_in_date, check_out_date, expires_at);
+-- Release on hangup
+CREATE INDEX IF NOT EXISTS room_holds_hold_key_idx ON room_holds (hold_key);
+-- Sweeper
+CREATE INDEX IF NOT EXISTS room_holds_expires_at_idx ON room_holds (expires_at);
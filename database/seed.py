@@ -0,0 +1,265 @@
+"""
+Synthetic data generator for load tests and benchmarks.
+
+Generates hotels, rooms, customers and bookings at configurable volumes and bulk
+loads them with COPY, streaming rows straight from Python generators so memory
+stays flat whatever the size. Bookings never overlap on a room, follow a seasonal
+pattern (summer and end-of-year peaks) and span two years of history plus one
+year ahead.
+
+    python database/seed.py --scale medium
+    python database/seed.py --hotels 2000 --rooms-per-hotel 150 --customers 2000000 --bookings 10000000 --defer-indexes
+
+Rows are appended after the existing ids; pass --truncate to start from empty tables.
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from migrate import DATABASE_URL, MIGRATIONS_DIR, apply_migrations, split_statements
+
+SCALES = {
+    "tiny": dict(hotels=10, rooms_per_hotel=20, customers=1_000, bookings=5_000),
+    "small": dict(hotels=50, rooms_per_hotel=40, customers=10_000, bookings=50_000),
+    "medium": dict(hotels=500, rooms_per_hotel=80, customers=200_000, bookings=1_000_000),
+    "large": dict(hotels=2_000, rooms_per_hotel=150, customers=2_000_000, bookings=10_000_000),
+}
+
+# City, relative share of hotels, price multiplier
+AREAS = [
+    ("Marrakech", 18, 1.2), ("Casablanca", 16, 1.1), ("Agadir", 12, 1.0), ("Fez", 10, 0.9),
+    ("Rabat", 9, 1.0), ("Tangier", 9, 1.0), ("Essaouira", 6, 0.95), ("Chefchaouen", 4, 0.8),
+    ("Ouarzazate", 3, 0.8), ("Meknes", 4, 0.85), ("Tetouan", 3, 0.85), ("Dakhla", 2, 1.1),
+    ("Oujda", 2, 0.8), ("El Jadida", 2, 0.9),
+]
+# Room type, share, base price, max guests
+ROOM_TYPES = [("Single", 30, 60.0, 1), ("Double", 40, 100.0, 2), ("Suite", 20, 180.0, 4), ("Deluxe", 10, 250.0, 5)]
+STAY_LENGTHS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [18, 22, 18, 12, 8, 6, 8, 5, 3]
+# Occupancy factor per month (Jan..Dec): higher means shorter gaps between stays
+SEASONALITY = [0.7, 0.7, 0.9, 1.1, 1.0, 1.2, 1.6, 1.7, 1.1, 0.9, 0.8, 1.3]
+HISTORY_DAYS = 730
+FUTURE_DAYS = 365
+
+FIRST_NAMES = ["Youssef", "Fatima", "Mohamed", "Khadija", "Omar", "Salma", "Amine", "Imane", "Karim", "Sara",
+               "John", "Emma", "Lucas", "Chloe", "Hugo", "Lea", "Ahmed", "Nadia", "David", "Maria"]
+LAST_NAMES = ["Alaoui", "Benali", "El Idrissi", "Tazi", "Bennani", "Chraibi", "Fassi", "Berrada", "Smith",
+              "Martin", "Dubois", "Garcia", "Rossi", "Muller", "Haddad", "Amrani"]
+FEEDBACK = ["Great stay, friendly staff.", "Room was clean and quiet.", "Breakfast could be better.",
+            "Excellent location.", "Air conditioning was noisy.", "Would come back again."]
+
+
+class CopyStream:
+    """Read-only file object over an iterator of text lines, consumed by cursor.copy_expert."""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = "".join(itertools.islice(self._lines, 2000))
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    readline = read
+
+
+def copy_rows(cursor, table, columns, lines):
+    started = time.perf_counter()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", CopyStream(lines), size=1 << 20)
+    print(f"  {table}: {cursor.rowcount} rows in {time.perf_counter() - started:.1f}s")
+    return cursor.rowcount
+
+
+def next_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(max(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def hotel_lines(rng, first_id, count):
+    areas = [area for area, _, _ in AREAS]
+    weights = [share for _, share, _ in AREAS]
+    for hotel_id in range(first_id, first_id + count):
+        area = rng.choices(areas, weights)[0]
+        yield f"{hotel_id}\tHotel {area} {hotel_id}\t{area}\n"
+
+
+def room_lines(rng, hotels, rooms_per_hotel, first_id):
+    """hotels is a list of (hotel_id, area); room numbers are '<hotel id>-<n>' to stay unique."""
+    multipliers = {area: multiplier for area, _, multiplier in AREAS}
+    weights = [share for _, share, _, _ in ROOM_TYPES]
+    room_id = first_id
+    for hotel_id, area in hotels:
+        tier = rng.uniform(0.8, 1.4) * multipliers.get(area, 1.0)
+        count = max(1, int(rng.gauss(rooms_per_hotel, rooms_per_hotel * 0.2)))
+        for number in range(1, count + 1):
+            room_type, _, base_price, max_guests = rng.choices(ROOM_TYPES, weights)[0]
+            price = round(base_price * tier, 2)
+            yield f"{room_id}\t{hotel_id}-{number}\t{room_type}\tt\t{price}\t{max_guests}\t{hotel_id}\n"
+            room_id += 1
+
+
+def customer_lines(rng, first_id, count):
+    for customer_id in range(first_id, first_id + count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield f"{customer_id}\t+2126{customer_id:08d}\t{name}\n"
+
+
+def booking_lines(rng, room_ids, customer_ids, bookings, first_id, today=None):
+    """
+    Non-overlapping stays per room. Each room walks forward through the window with
+    exponential gaps shortened in high season, so the per-room count averages out to
+    bookings / rooms. Customers are skewed towards low ids to get repeat guests.
+    """
+    today = today or date.today()
+    start = today - timedelta(days=HISTORY_DAYS)
+    window = HISTORY_DAYS + FUTURE_DAYS
+    # Precomputed day strings and seasonality, indexed by day offset in the window (plus slack for long stays)
+    days = [start + timedelta(days=offset) for offset in range(window + max(STAY_LENGTHS) + 1)]
+    iso_days = [day.isoformat() for day in days]
+    season = [SEASONALITY[day.month - 1] for day in days]
+    today_offset = HISTORY_DAYS
+
+    mean_stay = sum(l * w for l, w in zip(STAY_LENGTHS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+    per_room = bookings / max(len(room_ids), 1)
+    mean_gap = max(window / max(per_room, 1e-9) - mean_stay, 0.5)
+    stays = rng.choices(STAY_LENGTHS, STAY_WEIGHTS, k=4096)
+    customer_count = len(customer_ids)
+
+    booking_id = first_id
+    produced = 0
+    for room_id in room_ids:
+        offset = int(rng.expovariate(1 / mean_gap))
+        while offset < window and produced < bookings:
+            stay = stays[booking_id & 4095]
+            check_out = offset + stay
+            customer_id = customer_ids[int(customer_count * rng.random() ** 2)]
+            lead = int(rng.expovariate(1 / 30))
+            # Future stays were booked in the past too, never after today
+            created = min(max(offset - lead, 0), today_offset)
+            if check_out <= today_offset and rng.random() < 0.3:
+                feedback = rng.choice(FEEDBACK)
+            else:
+                feedback = "\\N"
+            yield (f"{booking_id}\t{customer_id}\t{iso_days[offset]}\t{iso_days[check_out]}\t{feedback}\t"
+                   f"{room_id}\t{iso_days[created]} 12:00:00\n")
+            booking_id += 1
+            produced += 1
+            offset = check_out + int(rng.expovariate(1 / mean_gap) / season[check_out])
+        if produced >= bookings:
+            break
+
+
+def index_statements():
+    """CREATE INDEX statements from the hot-path index migration, and the matching index names."""
+    with open(os.path.join(MIGRATIONS_DIR, "0002_hot_path_indexes.sql"), encoding="utf-8") as f:
+        statements = [statement for statement in split_statements(f.read()) if "CREATE INDEX" in statement]
+    names = [re.search(r"IF NOT EXISTS (\w+)", statement).group(1) for statement in statements]
+    return statements, names
+
+
+def reset_sequences(cursor):
+    for table in ("hotels", "rooms", "customers", "bookings"):
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(max(id), 1)) FROM {table}")
+
+
+def seed_database(connection, hotels, rooms_per_hotel, customers, bookings, seed=42, truncate=False,
+                  defer_indexes=False):
+    """Generate and COPY the requested volumes. Returns the row counts loaded per table."""
+    rng = random.Random(seed)
+    apply_migrations(connection)
+    connection.autocommit = True
+    cursor = connection.cursor()
+    cursor.execute("SET synchronous_commit = off")
+    started = time.perf_counter()
+
+    if truncate:
+        print("Truncating tables...")
+        # Booking ids restart at 1, so tombstones of the old rows would shadow the new ones
+        cursor.execute("TRUNCATE bookings, booking_tombstones, customers, rooms, hotels RESTART IDENTITY CASCADE")
+    create_indexes, index_names = index_statements()
+    if defer_indexes:
+        # Building the secondary indexes once after the load is much faster than maintaining them per row
+        for name in index_names:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+    counts = {}
+    print("Loading hotels...")
+    first_hotel = next_id(cursor, "hotels")
+    counts["hotels"] = copy_rows(cursor, "hotels", ["id", "name", "area"], hotel_lines(rng, first_hotel, hotels))
+    cursor.execute("SELECT id, area FROM hotels WHERE id >= %s ORDER BY id", (first_hotel,))
+    new_hotels = cursor.fetchall()
+
+    print("Loading rooms...")
+    first_room = next_id(cursor, "rooms")
+    counts["rooms"] = copy_rows(
+        cursor, "rooms", ["id", "room_number", "room_type", "is_available", "price_per_night", "max_guests", "hotel_id"],
+        room_lines(rng, new_hotels, rooms_per_hotel, first_room))
+
+    print("Loading customers...")
+    first_customer = next_id(cursor, "customers")
+    counts["customers"] = copy_rows(cursor, "customers", ["id", "phone_number", "name"],
+                                    customer_lines(rng, first_customer, customers))
+
+    print("Loading bookings...")
+    room_ids = list(range(first_room, first_room + counts["rooms"]))
+    rng.shuffle(room_ids)
+    customer_ids = list(range(first_customer, first_customer + counts["customers"]))
+    counts["bookings"] = copy_rows(
+        cursor, "bookings", ["id", "customer_id", "check_in_date", "check_out_date", "feedback", "room_id", "created_at"],
+        booking_lines(rng, room_ids, customer_ids, bookings, next_id(cursor, "bookings")))
+
+    reset_sequences(cursor)
+    if defer_indexes:
+        print("Rebuilding indexes...")
+        for statement in create_indexes:
+            cursor.execute(statement)
+    print("Analyzing...")
+    cursor.execute("ANALYZE hotels; ANALYZE rooms; ANALYZE customers; ANALYZE bookings;")
+    cursor.close()
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and bulk load synthetic hotel data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="preset volumes, overridden by explicit counts")
+    parser.add_argument("--hotels", type=int)
+    parser.add_argument("--rooms-per-hotel", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--bookings", type=int)
+    parser.add_argument("--seed", type=int, default=42, help="random seed, same seed gives the same data")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first (destroys existing data)")
+    parser.add_argument("--defer-indexes", action="store_true", help="drop hot-path indexes during the load")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+
+    volumes = dict(SCALES[args.scale or "small"])
+    for key in volumes:
+        if getattr(args, key) is not None:
+            volumes[key] = getattr(args, key)
+
+    connection = psycopg2.connect(args.database_url)
+    try:
+        seed_database(connection, seed=args.seed, truncate=args.truncate, defer_indexes=args.defer_indexes, **volumes)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
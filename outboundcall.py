@@ -1,10 +1,12 @@
 import asyncio
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
 
-from twilio.rest import Client
-import websockets
 from dotenv import load_dotenv
-import uvicorn
 import re
 
 # Load environment variables
@@ -13,63 +15,246 @@ load_dotenv()
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 PHONE_NUMBER_FROM = os.getenv('TWILIO_FROM_NUMBER')
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
 # Domain processing for WebSocket connection
 raw_domain = os.getenv('DOMAIN', '')
 DOMAIN = re.sub(r'(^\w+:|^)\/\/|\/+$', '', raw_domain)  # Strip protocols and trailing slashes from DOMAIN
 
-async def check_number_allowed(to):
-    """Check if a number is allowed to be called."""
-    try:
-        # Log to debug the incoming and outgoing number check
-        print(f"Checking if the number {to} is allowed to be called.")
+# How long the allow-list fetched from Twilio is trusted before being reloaded
+ALLOWLIST_TTL = float(os.getenv('OUTBOUND_ALLOWLIST_TTL', 300))
+# Dials in flight at once, and the account's calls-per-second limit (Twilio's default is 1)
+DIAL_CONCURRENCY = int(os.getenv('OUTBOUND_DIAL_CONCURRENCY', 5))
+CALLS_PER_SECOND = float(os.getenv('OUTBOUND_CALLS_PER_SECOND', 1))
+MAX_TRACKED_CALLS = 10000
+
+_client = None
+_client_lock = threading.Lock()
 
-        incoming_numbers = client.incoming_phone_numbers.list(phone_number=to)
-        if incoming_numbers:
-            print(f"Incoming number {to} is allowed.")
-            return True
 
-        outgoing_caller_ids = client.outgoing_caller_ids.list(phone_number=to)
-        if outgoing_caller_ids:
-            print(f"Outgoing caller ID {to} is allowed.")
-            return True
+def status_callback_url(call_id):
+    """The URL Twilio posts the call's status to, or None without a DOMAIN."""
+    return f"https://{DOMAIN}/outbound-calls/{call_id}/status" if DOMAIN else None
 
-        print(f"The number {to} is not allowed.")
+
+def is_twilio_request(url, params, signature):
+    """Whether X-Twilio-Signature matches the request Twilio made to url with these form params."""
+    if not TWILIO_AUTH_TOKEN or not signature:
         return False
+    from twilio.request_validator import RequestValidator  # only needed for the callbacks
+
+    return RequestValidator(TWILIO_AUTH_TOKEN).validate(url, params, signature)
+
+
+def get_client():
+    """Twilio REST client, created on first use so importing this module does no I/O."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from twilio.rest import Client  # a large package, only needed once a call is placed
+
+            _client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        return _client
+
+
+class AllowList:
+    """
+    Numbers that may be called: the account's own numbers and its verified caller IDs.
+
+    Loaded with one listing of each (instead of two Twilio requests per number dialed)
+    and cached for ALLOWLIST_TTL seconds.
+    """
+
+    def __init__(self, ttl=ALLOWLIST_TTL):
+        self.ttl = ttl
+        self._numbers = frozenset()
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def _fetch(self):
+        client = get_client()
+        numbers = {number.phone_number for number in client.incoming_phone_numbers.list()}
+        numbers.update(caller_id.phone_number for caller_id in client.outgoing_caller_ids.list())
+        return frozenset(numbers)
+
+    async def numbers(self):
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._numbers = await asyncio.to_thread(self._fetch)
+                self._loaded_at = time.monotonic()
+                print(f"Outbound allow-list loaded: {len(self._numbers)} numbers.")
+            return self._numbers
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def split(self, phone_numbers):
+        """(allowed, rejected) lists, keeping the given order."""
+        allowed_numbers = await self.numbers()
+        allowed = [number for number in phone_numbers if number in allowed_numbers]
+        rejected = [number for number in phone_numbers if number not in allowed_numbers]
+        return allowed, rejected
+
+
+allow_list = AllowList()
+
+
+async def check_number_allowed(to):
+    """Check if a number is allowed to be called."""
+    try:
+        allowed, _ = await allow_list.split([to])
+        if not allowed:
+            print(f"The number {to} is not allowed.")
+        return bool(allowed)
     except Exception as e:
         print(f"Error checking phone number: {e}")
         return False
 
-async def make_call(phone_number_to_call: str):
-    """Make an outbound call."""
-    if not phone_number_to_call:
-        raise ValueError("Please provide a phone number to call.")
-
-    is_allowed = await check_number_allowed(phone_number_to_call)
-    if not is_allowed:
-        raise ValueError(f"The number {phone_number_to_call} is not recognized as a valid outgoing number or caller ID.")
 
+def outbound_twiml(phone_number_to_call):
     # Ensure compliance with applicable laws and regulations
     # All of the rules of TCPA apply even if a call is made by AI.
     # Do your own diligence for compliance.
-
-    outbound_twiml = (
+    return (
         f'<?xml version="1.0" encoding="UTF-8"?>'
         f'<Response><Connect><Stream url="wss://{DOMAIN}/media-stream-outbound/{phone_number_to_call}" /></Connect></Response>'
     )
 
-    call = client.calls.create(
+
+def create_call(phone_number_to_call, status_callback=None):
+    """Blocking Twilio request placing the call; run it in a thread."""
+    options = {}
+    if status_callback:
+        options = {"status_callback": status_callback,
+                   "status_callback_event": ["initiated", "ringing", "answered", "completed"]}
+    return get_client().calls.create(
         from_=PHONE_NUMBER_FROM,
         to=phone_number_to_call,
-        twiml=outbound_twiml
+        twiml=outbound_twiml(phone_number_to_call),
+        **options
     )
 
+
+async def make_call(phone_number_to_call: str):
+    """Make an outbound call and return its SID."""
+    if not phone_number_to_call:
+        raise ValueError("Please provide a phone number to call.")
+
+    is_allowed = await check_number_allowed(phone_number_to_call)
+    if not is_allowed:
+        raise ValueError(f"The number {phone_number_to_call} is not recognized as a valid outgoing number or caller ID.")
+
+    call = await asyncio.to_thread(create_call, phone_number_to_call)
     await log_call_sid(call.sid)
+    return call.sid
+
 
 async def log_call_sid(call_sid):
     """Log the call SID."""
     print(f"Call started with SID: {call_sid}")
-if __name__ == "__main__":
-    asyncio.run(make_call(PHONE_NUMBER_FROM))
 
+
+class OutboundCall:
+    __slots__ = ("id", "phone_number", "status", "call_sid", "error", "created_at", "updated_at")
+
+    def __init__(self, phone_number):
+        self.id = uuid.uuid4().hex
+        self.phone_number = phone_number
+        self.status = "queued"
+        self.call_sid = None
+        self.error = None
+        self.created_at = self.updated_at = datetime.utcnow()
+
+    def update(self, status, **fields):
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.updated_at = datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "phone_number": self.phone_number,
+            "status": self.status,
+            "call_sid": self.call_sid,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class OutboundDialer:
+    """
+    Queue of outbound calls dialed by a few worker tasks.
+
+    enqueue() validates a batch against the allow-list and returns at once; the
+    workers place the calls in threads, paced to CALLS_PER_SECOND, and the status
+    of every call can be read back with get().
+    """
+
+    def __init__(self, concurrency=DIAL_CONCURRENCY, calls_per_second=CALLS_PER_SECOND):
+        self.concurrency = concurrency
+        self.interval = 1 / calls_per_second if calls_per_second > 0 else 0
+        self.calls = OrderedDict()
+        self._queue = None
+        self._workers = []
+        self._next_dial = 0.0
+        self._pace_lock = None
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._pace_lock = asyncio.Lock()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._work()))
+
+    def _track(self, call):
+        self.calls[call.id] = call
+        while len(self.calls) > MAX_TRACKED_CALLS:
+            self.calls.popitem(last=False)
+
+    async def enqueue(self, phone_numbers):
+        """Queue calls to the allowed numbers; returns (queued calls, rejected numbers)."""
+        phone_numbers = list(dict.fromkeys(number.strip() for number in phone_numbers if number and number.strip()))
+        allowed, rejected = await allow_list.split(phone_numbers)
+        self._ensure_workers()
+        queued = []
+        for number in allowed:
+            call = OutboundCall(number)
+            self._track(call)
+            self._queue.put_nowait(call)
+            queued.append(call)
+        return queued, rejected
+
+    def get(self, call_id):
+        return self.calls.get(call_id)
+
+    async def _pace(self):
+        # Spread dials over time so a batch stays within the account's calls-per-second limit
+        async with self._pace_lock:
+            delay = self._next_dial - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_dial = max(self._next_dial, time.monotonic()) + self.interval
+
+    async def _work(self):
+        while True:
+            call = await self._queue.get()
+            try:
+                await self._pace()
+                call.update("dialing")
+                status_callback = status_callback_url(call.id)
+                twilio_call = await asyncio.to_thread(create_call, call.phone_number, status_callback)
+                call.update("initiated", call_sid=twilio_call.sid)
+                await log_call_sid(twilio_call.sid)
+            except Exception as e:
+                print(f"Error dialing {call.phone_number}: {e}")
+                call.update("failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+dialer = OutboundDialer()
+
+if __name__ == "__main__":
+    print(asyncio.run(make_call(PHONE_NUMBER_FROM)))
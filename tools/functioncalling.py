@@ -1,14 +1,22 @@
-import inspect
+import asyncio
+import hashlib
+import json
 import os
-from datetime import date
+import time
+from datetime import date, datetime
+from decimal import Decimal
 
 from tools import send_sms, send_email_with_banner, book_room, get_available_rooms, web_scraper_for_recommendation
 from tools.tools import delete_booking, alter_booking, find_booking_by_number, add_feedback, hangup, chromadb_retrieval, \
-    get_customer_by_phone_number, add_customer
+    get_customer_by_phone_number, add_customer, hotel_directory, book_rooms, MAX_GROUP_ROOMS
+from tools.registry import Param, Tool, ToolArgumentError, ToolRegistry
 
 
-def book_room_function(hotel_name: str, room_number: str, customer_name: str,customer_number: str, check_in: date, check_out: date):
+def book_room_function(hotel_name: str, room_number: str, customer_number: str, check_in: date, check_out: date,
+                       hold_key: str = None):
     """This function books a room, call this function when the user wants to book a room."""
+    customer = get_customer_by_phone_number(customer_number)
+    customer_name = customer["name"] if isinstance(customer, dict) else customer_number
 
     # Book the room (you can add your room booking logic here)
     # Here we assume the room is successfully booked
@@ -20,18 +28,46 @@ def book_room_function(hotel_name: str, room_number: str, customer_name: str,cus
 
     # Send confirmation SMS to the hotel
     send_sms(hotel_phone_number, confirmation_message)
-    send_email_with_banner(hotel_name,room_number, customer_name, check_in, check_out)
-    return book_room(hotel_name, room_number,customer_number, check_in, check_out)
+    send_email_with_banner(hotel_name, room_number, customer_name, check_in.isoformat(), check_out.isoformat())
+    return book_room(hotel_name, room_number,customer_number, check_in, check_out, hold_key)
+
+def book_rooms_function(customer_number: str, rooms: list, hold_key: str = None):
+    """Books several rooms at once for one customer (a family or a group), each with its own hotel and dates. All the rooms are booked or none: use this instead of calling book_room_function once per room."""
+    result = book_rooms(customer_number, rooms, hold_key)
+    if result["status"] == "booked":
+        # One confirmation for the whole group, sent once the bookings are committed
+        # The bookings stand whatever happens here: a failed notification is reported, not raised
+        lines = [f"{hotel} room {room}: {check_in} to {check_out}"
+                 for _, hotel, room, check_in, check_out, _ in result["bookings"]]
+        try:
+            send_sms(os.getenv('HOTEL_PHONE_NUMBER'),
+                     f"Group booking confirmed for {result['customer']} ({len(lines)} rooms):\n" + "\n".join(lines))
+        except Exception as e:
+            print(f"Group booking confirmation SMS failed: {e}")
+            result["notification_error"] = f"SMS not sent: {e}"
+        try:
+            send_email_with_banner(
+                ", ".join(dict.fromkeys(row[1] for row in result["bookings"])),
+                ", ".join(row[2] for row in result["bookings"]),
+                result["customer"],
+                min(row[3] for row in result["bookings"]).isoformat(),
+                max(row[4] for row in result["bookings"]).isoformat(),
+            )
+        except Exception as e:
+            print(f"Group booking confirmation email failed: {e}")
+            result["notification_error"] = f"Email not sent: {e}"
+    return result
 
 def get_available_rooms_function(
     check_in: date,
     check_out: date,
     area: str,
     room_type: str = None,
-    max_guests: int = None
+    max_guests: int = None,
+    hold_key: str = None
 ):
-    """Fetches available rooms in a specified area for given check-in and check-out dates. Optionally filters by room type and maximum guest count."""
-    return get_available_rooms(check_in, check_out, area, room_type, max_guests)
+    """Fetches available rooms in a specified area for given check-in and check-out dates. Optionally filters by room type and maximum guest count. Rooms marked on hold are kept for this customer for a few minutes: offer them first."""
+    return get_available_rooms(check_in, check_out, area, room_type, max_guests, hold_key)
 def delete_booking_function(booking_id: int):
     """
     Deletes a booking record using the booking ID.
@@ -42,13 +78,13 @@ def alter_booking_function(
     booking_id: int,
     new_check_in: date = None,
     new_check_out: date = None,
-    new_customer_name: str = None,
     new_customer_number: str = None,
+    hold_key: str = None,
 ):
     """
     Modifies an existing booking with updated details such as dates or customer information.
     """
-    return alter_booking(booking_id, new_check_in, new_check_out, new_customer_name, new_customer_number)
+    return alter_booking(booking_id, new_check_in, new_check_out, new_customer_number, hold_key=hold_key)
 def get_customer_function(phone_number: str):
     """Fetches customer information using their phone number."""
     return get_customer_by_phone_number(phone_number)
@@ -68,59 +104,6 @@ def webscraper_for_recommendations_function(topic:str):
 def hangup_function():
     """Hang up function. For where the conversation with user is over."""
     return hangup()
-def function_to_schema(func) -> dict:
-    """
-    Converts a Python function's signature into a JSON schema format.
-
-    Args:
-        func: The Python function to convert into a JSON schema.
-
-    Returns:
-        dict: A JSON schema describing the function.
-    """
-    # Map Python types to JSON Schema types
-    type_map = {
-        str: "string",
-        int: "integer",
-        float: "number",
-        bool: "boolean",
-        list: "array",
-        dict: "object",
-        type(None): "null",
-        date: "string",  # Represent date as a string in ISO 8601 format
-    }
-
-    try:
-        signature = inspect.signature(func)
-    except ValueError:
-        raise ValueError(f"Failed to get signature for function {func.__name__}.")
-
-    # Extract parameter properties
-    properties = {}
-    required = []
-    for param in signature.parameters.values():
-        annotation = param.annotation
-        param_type = type_map.get(annotation, "string")  # Default to "string" if unknown
-        properties[param.name] = {"type": param_type}
-
-        # Add a format for date type
-        if annotation == date:
-            properties[param.name]["format"] = "date"
-
-        # Add to required list if no default value is provided
-        if param.default is inspect.Parameter.empty:
-            required.append(param.name)
-
-    return {
-        "type": "function",
-        "name": func.__name__,
-        "description": (func.__doc__ or "").strip(),
-        "parameters": {
-            "type": "object",
-            "properties": properties,
-            "required": required,
-        },
-    }
 def add_customer_function(phone_number: str, customer_name: str):
     """
     Add a new customer to the database.
@@ -144,41 +127,363 @@ def knowledgebase_retrieval_function(query_embedding: str):
         List of the top-k relevant documents.
     """
     return chromadb_retrieval(query_embedding)
-async def invoke_function(function_name, arguments):
+IDEMPOTENCY_WINDOW = 120  # seconds a side-effecting call is remembered
+
+
+def tool_error(error_type, message, retryable=False):
+    """Structured error returned to the model instead of a bare null."""
+    return {"error": {"type": error_type, "message": message, "retryable": retryable}}
+
+
+class ToolCallState:
+    """
+    Per-conversation tool state. Side-effecting calls are keyed by tool name and
+    arguments, so a model retry (or the same call twice in one response) awaits
+    the first execution instead of booking or texting twice.
+    """
+
+    def __init__(self, window=IDEMPOTENCY_WINDOW, prefetcher=None, context=None):
+        self.window = window
+        self._calls = {}  # idempotency key -> (tool name, started at, task)
+        # Values for the tools' context arguments (Tool.context), e.g. {"hold_key": <call id>}
+        self.context = context or {}
+        # agents.prefetch.AvailabilityPrefetcher answering get_available_rooms_function, if enabled
+        self.prefetcher = prefetcher
+
+    @staticmethod
+    def idempotency_key(tool_name, kwargs):
+        payload = json.dumps(kwargs, sort_keys=True, default=_json_default)
+        return hashlib.sha1(f"{tool_name}:{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry = self._calls.get(key)
+        if entry is None:
+            return None
+        _, started_at, task = entry
+        if task.done() and time.monotonic() - started_at > self.window:
+            del self._calls[key]
+            return None
+        return task
+
+    def start(self, key, tool, kwargs):
+        task = asyncio.create_task(asyncio.to_thread(tool.handler, **kwargs))
+        self._calls[key] = (tool.name, time.monotonic(), task)
+        task.add_done_callback(lambda finished: self._finished(key, tool.name, finished))
+        return task
+
+    def _finished(self, key, tool_name, task):
+        if task.cancelled() or task.exception() is not None:
+            # Nothing was done, let the model retry
+            self._calls.pop(key, None)
+            return
+        if self.prefetcher is not None:
+            # Prefetched availability may include what was just booked
+            self.prefetcher.invalidate()
+        # A successful write changes what other writes would do (e.g. add_customer
+        # before book_room), so forget completed calls of the other tools.
+        for other_key, (other_name, _, other_task) in list(self._calls.items()):
+            if other_name != tool_name and other_task.done():
+                del self._calls[other_key]
+
+
+async def invoke_function(function_name, arguments, state=None):
     """
-    Dynamically invokes a function by name with the given arguments.
+    Validates the arguments against the tool registry and invokes the tool.
+    The tools are blocking (DB, Twilio, SMTP), so they run in a worker thread,
+    bounded by the tool's timeout. Failures come back as tool_error() dicts.
     """
+    tool = TOOLS.get(function_name)
+    if tool is None:
+        print(f"Function {function_name} is not recognized.")
+        return tool_error("unknown_tool", f"Function {function_name} does not exist.")
     try:
-        # Map function names to actual functions
-        function_map = {
-            "get_available_rooms_function": get_available_rooms_function,
-            "book_room_function": book_room_function,
-            "webscraper_for_recommendations_function": webscraper_for_recommendations_function,
-            "alter_booking_function": alter_booking_function,
-            "find_booking_by_number_function": find_booking_by_number_function,
-            "add_feedback_function": add_feedback_function,
-            "hangup_function": hangup_function,
-            "get_customer_function": get_customer_function,
-            "add_customer_function": add_customer_function,
-            "knowledgebase_retrieval_function": knowledgebase_retrieval_function,
-            # Add more functions here as needed
-        }
-        if function_name in function_map:
-            result = function_map[function_name](**arguments)
-            print(f"Function {function_name} invoked successfully with result: {result}")
+        kwargs = tool.validate(arguments)
+    except ToolArgumentError as e:
+        print(f"Rejected arguments for {function_name}: {e}")
+        return tool_error("invalid_arguments", str(e), retryable=True)
+    if state is not None:
+        kwargs.update((name, state.context[name]) for name in tool.context if name in state.context)
+
+    if tool.name == "get_available_rooms_function" and state is not None and state.prefetcher is not None:
+        try:
+            # Bounded like the tool itself; a prefetch that hangs falls back to a fresh query
+            result = await asyncio.wait_for(
+                state.prefetcher.lookup(**{name: value for name, value in kwargs.items() if name != "hold_key"}),
+                tool.timeout)
+        except asyncio.TimeoutError:
+            print(f"Prefetched availability not ready after {tool.timeout}s, querying again.")
+            result = None
+        if result is not None:
+            print(f"Function {function_name} answered from the prefetched availability.")
             return result
+
+    if tool.side_effect and state is not None:
+        key = state.idempotency_key(tool.name, kwargs)
+        task = state.get(key)
+        if task is not None:
+            print(f"Function {function_name} already executed with these arguments, reusing its result.")
         else:
-            print(f"Function {function_name} is not recognized.")
+            task = state.start(key, tool, kwargs)
+    else:
+        task = asyncio.ensure_future(asyncio.to_thread(tool.handler, **kwargs))
+
+    try:
+        # shield: on timeout the running call is kept, so a retry picks up its result
+        result = await asyncio.wait_for(asyncio.shield(task), tool.timeout)
+    except asyncio.TimeoutError:
+        print(f"Function {function_name} timed out after {tool.timeout}s.")
+        if tool.side_effect:
+            return tool_error("timeout", f"{function_name} is still running and may complete. Calling it again with "
+                                         "the same arguments returns its result instead of running it twice.")
+        return tool_error("timeout", f"{function_name} did not answer within {tool.timeout:g} seconds.", retryable=True)
     except Exception as e:
         print(f"Error invoking function {function_name}: {e}")
+        return tool_error("tool_error", f"{function_name} failed: {e}")
+    print(f"Function {function_name} invoked successfully with result: {result}")
+    return result
+
+async def run_function_calls(function_calls, state=None):
+    """
+    Runs the function calls of one model response concurrently.
+
+    Each call is a dict with "name", "arguments" and "call_id". A call only waits
+    for the earlier calls it depends on (Tool.depends_on), so independent
+    tools overlap and the whole batch takes as long as its slowest chain.
+    Returns (call, result, latency_ms) triples in the order the calls were given,
+    latency_ms being the tool's own run time, without the wait for its dependencies.
+    """
+    tasks = []
+
+    async def run(index, call):
+        tool = TOOLS.get(call["name"])
+        depends_on = tool.depends_on if tool else frozenset()
+        waits = [
+            tasks[i] for i, earlier in enumerate(function_calls[:index])
+            if "*" in depends_on or earlier["name"] in depends_on
+        ]
+        if waits:
+            await asyncio.gather(*waits, return_exceptions=True)
+        started = time.perf_counter()
+        result = await invoke_function(call["name"], call["arguments"], state)
+        return result, (time.perf_counter() - started) * 1000
+
+    for index, call in enumerate(function_calls):
+        tasks.append(asyncio.create_task(run(index, call)))
+    results = await asyncio.gather(*tasks)
+    return [(call, result, latency_ms) for call, (result, latency_ms) in zip(function_calls, results)]
+
+# Result shaping: tool results are sent back to the model as JSON, so keep them small.
+MAX_ROOMS_PER_HOTEL = 10
+MAX_RECOMMENDATIONS = 3
+MAX_TEXT_CHARS = 300
+MAX_RESULT_CHARS = 4000
+
+
+def _truncate(text, limit=MAX_TEXT_CHARS):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def _json_default(value):
+    """Fallback encoder for values json.dumps does not know about."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "__table__"):
+        # ORM row: keep its column values only, never lazy-load relationships
+        return {column.name: getattr(value, column.key, None) for column in value.__mapper__.columns}
+    return str(value)
+
+
+def _shape_available_rooms(result):
+    """Group rooms by hotel so the hotel name and area are sent once, rooms as compact rows."""
+    if not isinstance(result, list):
+        return result
+    hotels = {}
+    for room in result:
+        hotel = hotels.setdefault(room["hotel_name"], {
+            "hotel": room["hotel_name"],
+            "area": room["hotel_area"],
+            "rooms": [],
+            "more": 0,
+        })
+        if len(hotel["rooms"]) < MAX_ROOMS_PER_HOTEL:
+            hotel["rooms"].append([room["room_number"], room["room_type"], room["price_per_night"], room["max_guests"]])
+            if room.get("on_hold"):
+                hotel.setdefault("on_hold", []).append(room["room_number"])
+        else:
+            hotel["more"] += 1
+    for hotel in hotels.values():
+        if not hotel["more"]:
+            del hotel["more"]
+    return {"columns": ["room_number", "room_type", "price_per_night", "max_guests"], "hotels": list(hotels.values())}
+
+
+def _shape_recommendations(result):
+    """Keep the top results of a Tavily search with their content truncated."""
+    if not isinstance(result, list):
+        return result
+    return [
+        {"title": item.get("title"), "url": item.get("url"), "content": _truncate(item.get("content", ""))}
+        for item in result[:MAX_RECOMMENDATIONS]
+    ]
+
+
+def _shape_bookings(result):
+    """Turn bookings (ORM rows or dicts) into small dicts with ISO dates."""
+    if not isinstance(result, list):
+        return result
+    bookings = []
+    for booking in result:
+        if isinstance(booking, dict):
+            bookings.append(booking)
+            continue
+        bookings.append({
+            "booking_id": booking.id,
+            "room_id": booking.room_id,
+            "check_in": booking.check_in_date,
+            "check_out": booking.check_out_date,
+            "feedback": booking.feedback,
+        })
+    return bookings
+
+
+def _shape_customer(result):
+    if isinstance(result, dict) and "bookings" in result:
+        return {**result, "bookings": _shape_bookings(result["bookings"])}
+    return result
+
+
+def _shape_hangup(result):
+    return "The call will be ended."
+
+
+RESULT_SHAPERS = {
+    "get_available_rooms_function": _shape_available_rooms,
+    "webscraper_for_recommendations_function": _shape_recommendations,
+    "find_booking_by_number_function": _shape_bookings,
+    "get_customer_function": _shape_customer,
+    "hangup_function": _shape_hangup,
+}
+
+
+def serialize_result(function_name, result):
+    """
+    Shapes a tool result with its per-tool compact schema and encodes it as
+    compact JSON (ISO dates, no whitespace) for a function_call_output item.
+    """
+    shaper = RESULT_SHAPERS.get(function_name)
+    if shaper:
+        result = shaper(result)
+    output = json.dumps(result, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+    if len(output) > MAX_RESULT_CHARS:
+        # Still too big after shaping: send a truncated copy as plain text
+        output = json.dumps(_truncate(output, MAX_RESULT_CHARS), ensure_ascii=False)
+    return output
+
+MAX_CONTEXT_BOOKINGS = 5
+
+
+async def load_customer_context(phone_number):
+    """
+    Looks up the caller and their most recent bookings, and returns it as text for
+    the first conversation item, so the model does not spend a tool call on it.
+    """
+    try:
+        customer = await asyncio.to_thread(get_customer_by_phone_number, phone_number)
+    except Exception as e:
+        print(f"Could not preload customer {phone_number}: {e}")
+        return None
+    if isinstance(customer, dict):
+        customer = {**customer, "bookings": customer["bookings"][-MAX_CONTEXT_BOOKINGS:]}
+        return ("Customer profile, already retrieved (no need to call get_customer_function): "
+                + serialize_result("get_customer_function", customer))
+    return (f"No customer is registered with phone number {phone_number}. "
+            "Ask for their name and create the profile with add_customer_function.")
+
+
+async def load_hotel_directory():
+    """
+    The hotel directory with room prices for the system prompt, from tools.tools.hotel_directory
+    (the database is only queried when the cache is stale). None if it cannot be loaded.
+    """
+    text = hotel_directory.cached()
+    if text is not None:
+        return text
+    try:
+        return await asyncio.to_thread(hotel_directory.get)
+    except Exception as e:
+        print(f"Could not load the hotel directory: {e}")
+        return None
+
+ROOM_TYPES = ("Single", "Double", "Suite", "Deluxe")
 
-inbound_caller_tools = [book_room_function, get_available_rooms_function,
-             webscraper_for_recommendations_function,delete_booking_function,alter_booking_function,
-             find_booking_by_number_function,hangup_function,
-            knowledgebase_retrieval_function,get_customer_function,add_customer_function]
-inbound_caller_tool_schemas = [function_to_schema(tool) for tool in inbound_caller_tools]
+# Single source of truth for the tool schemas and the invoke_function dispatch table.
+TOOLS = ToolRegistry([
+    Tool(book_room_function, params=[
+        Param("hotel_name", description="Exact hotel name, e.g. 'Hotel Atlas'."),
+        Param("room_number", description="Room number returned by get_available_rooms_function."),
+        Param("customer_number", description="The customer's phone number."),
+        Param("check_in", "date"),
+        Param("check_out", "date"),
+    ], depends_on={"add_customer_function"}, side_effect=True, timeout=45, context=("hold_key",)),
+    Tool(book_rooms_function, params=[
+        Param("customer_number", description="The customer's phone number."),
+        Param("rooms", "array", max_items=MAX_GROUP_ROOMS, items=[
+            Param("hotel_name", description="Exact hotel name, e.g. 'Hotel Atlas'."),
+            Param("room_number", description="Room number returned by get_available_rooms_function."),
+            Param("check_in", "date"),
+            Param("check_out", "date"),
+        ]),
+    ], depends_on={"add_customer_function"}, side_effect=True, timeout=45, context=("hold_key",)),
+    Tool(get_available_rooms_function, params=[
+        Param("check_in", "date"),
+        Param("check_out", "date"),
+        Param("area", description="City of the hotel, e.g. 'Marrakech'."),
+        Param("room_type", required=False, enum=ROOM_TYPES),
+        Param("max_guests", "integer", required=False),
+    ], context=("hold_key",)),
+    Tool(delete_booking_function, params=[
+        Param("booking_id", "integer"),
+    ], side_effect=True),
+    Tool(alter_booking_function, params=[
+        Param("booking_id", "integer"),
+        Param("new_check_in", "date", required=False),
+        Param("new_check_out", "date", required=False),
+        Param("new_customer_number", required=False,
+              description="Phone number of the registered customer the booking is transferred to."),
+    ], depends_on={"add_customer_function"}, side_effect=True, context=("hold_key",)),
+    Tool(get_customer_function, params=[
+        Param("phone_number"),
+    ]),
+    Tool(find_booking_by_number_function, params=[
+        Param("customer_number", description="The customer's phone number."),
+    ]),
+    Tool(add_feedback_function, params=[
+        Param("booking_id", "integer"),
+        Param("feedback"),
+    ], side_effect=True),
+    Tool(webscraper_for_recommendations_function, params=[
+        Param("topic"),
+    ], timeout=10),
+    Tool(hangup_function, depends_on={"*"}),
+    Tool(add_customer_function, params=[
+        Param("phone_number"),
+        Param("customer_name"),
+    ], side_effect=True),
+    Tool(knowledgebase_retrieval_function, params=[
+        Param("query_embedding"),
+    ]),
+])
 
+inbound_caller_tool_schemas = TOOLS.schemas([
+    "book_room_function", "book_rooms_function", "get_available_rooms_function", "webscraper_for_recommendations_function",
+    "delete_booking_function", "alter_booking_function", "find_booking_by_number_function", "hangup_function",
+    "knowledgebase_retrieval_function", "get_customer_function", "add_customer_function",
+])
 
-outbound_caller_tools = [get_customer_by_phone_number,find_booking_by_number_function, webscraper_for_recommendations_function, add_feedback_function,
-         hangup_function]
-outbound_caller_tool_schemas = [function_to_schema(tool) for tool in outbound_caller_tools]
\ No newline at end of file
+outbound_caller_tool_schemas = TOOLS.schemas([
+    "get_customer_function", "find_booking_by_number_function", "webscraper_for_recommendations_function",
+    "add_feedback_function", "hangup_function",
+])
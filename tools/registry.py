@@ -0,0 +1,215 @@
+"""
+Declarative registry of the tools exposed to the realtime model.
+
+Every tool is described once (name, handler, parameters, dependencies). The JSON
+schemas sent in `session.update` and the dispatch table used by `invoke_function`
+are both derived from that description when the module is imported, so they can
+never drift apart. Argument validation uses coercers picked per parameter up front,
+which lets bad arguments from the model be rejected before a tool touches the DB.
+"""
+import inspect
+from datetime import date, datetime
+
+DEFAULT_TOOL_TIMEOUT = 15.0
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the model sends arguments that do not match a tool's parameters."""
+
+
+def _coerce_string(value):
+    if not isinstance(value, str):
+        raise ToolArgumentError(f"expected a string, got {value!r}")
+    return value.strip()
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool):
+        raise ToolArgumentError(f"expected an integer, got {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    raise ToolArgumentError(f"expected an integer, got {value!r}")
+
+
+def _coerce_number(value):
+    if isinstance(value, bool):
+        raise ToolArgumentError(f"expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ToolArgumentError(f"expected a number, got {value!r}")
+
+
+def _coerce_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if value in ("true", "false"):
+        return value == "true"
+    raise ToolArgumentError(f"expected a boolean, got {value!r}")
+
+
+def _coerce_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            pass
+    raise ToolArgumentError(f"expected a date in YYYY-MM-DD format, got {value!r}")
+
+
+def _coerce_array(value):
+    if not isinstance(value, list):
+        raise ToolArgumentError(f"expected an array, got {value!r}")
+    return value
+
+
+COERCERS = {
+    "string": _coerce_string,
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "boolean": _coerce_boolean,
+    "date": _coerce_date,
+    "array": _coerce_array,
+}
+
+
+def _object_schema(params):
+    return {
+        "type": "object",
+        "properties": {param.name: param.schema() for param in params},
+        "required": [param.name for param in params if param.required],
+    }
+
+
+def _validate_object(params, arguments, what):
+    """Coerce a JSON object against params, or raise ToolArgumentError."""
+    if not isinstance(arguments, dict):
+        raise ToolArgumentError(f"{what} must be a JSON object")
+    kwargs = {}
+    for param in params:
+        value = arguments.get(param.name)
+        if value is None or value == "":
+            if param.required:
+                raise ToolArgumentError(f"missing required argument '{param.name}'")
+            continue
+        try:
+            kwargs[param.name] = param.validate(value)
+        except ToolArgumentError as e:
+            raise ToolArgumentError(f"invalid '{param.name}': {e}")
+    return kwargs
+
+
+class Param:
+    """
+    One tool parameter: its JSON schema and the coercer used to validate it.
+    An "array" parameter is a list of objects whose fields are the `items` params.
+    """
+    __slots__ = ("name", "type", "description", "required", "enum", "items", "max_items", "coerce")
+
+    def __init__(self, name, type="string", description=None, required=True, enum=None, items=(), max_items=None):
+        if type not in COERCERS:
+            raise ValueError(f"Unsupported parameter type '{type}' for '{name}'.")
+        if (type == "array") != bool(items):
+            raise ValueError(f"Parameter '{name}': items are required for arrays, and only for arrays.")
+        self.name = name
+        self.type = type
+        self.description = description
+        self.required = required
+        self.enum = tuple(enum) if enum else None
+        self.items = tuple(items)
+        self.max_items = max_items
+        self.coerce = COERCERS[type]
+
+    def schema(self):
+        if self.type == "date":
+            schema = {"type": "string", "format": "date"}
+        elif self.type == "array":
+            schema = {"type": "array", "items": _object_schema(self.items), "minItems": 1}
+            if self.max_items:
+                schema["maxItems"] = self.max_items
+        else:
+            schema = {"type": self.type}
+        if self.description:
+            schema["description"] = self.description
+        if self.enum:
+            schema["enum"] = list(self.enum)
+        return schema
+
+    def validate(self, value):
+        value = self.coerce(value)
+        if self.type == "array":
+            if not value:
+                raise ToolArgumentError("expected at least one item")
+            if self.max_items and len(value) > self.max_items:
+                raise ToolArgumentError(f"at most {self.max_items} items, got {len(value)}")
+            items = []
+            for index, item in enumerate(value):
+                try:
+                    items.append(_validate_object(self.items, item, "each item"))
+                except ToolArgumentError as e:
+                    raise ToolArgumentError(f"item {index}: {e}")
+            return items
+        if self.enum and value not in self.enum:
+            raise ToolArgumentError(f"'{self.name}' must be one of {', '.join(map(str, self.enum))}, got {value!r}")
+        return value
+
+
+class Tool:
+    """A callable tool: handler, parameters, and the schema built from them."""
+    __slots__ = ("name", "handler", "description", "params", "depends_on", "side_effect", "timeout", "context",
+                 "schema")
+
+    def __init__(self, handler, params=(), description=None, depends_on=(), side_effect=False,
+                 timeout=DEFAULT_TOOL_TIMEOUT, context=()):
+        self.name = handler.__name__
+        self.handler = handler
+        self.description = description or inspect.cleandoc(handler.__doc__ or "")
+        self.params = tuple(params)
+        # Names of tools that must finish first when called in the same response; "*" means all earlier calls
+        self.depends_on = frozenset(depends_on)
+        # Side-effecting tools (bookings, SMS, DB writes) are deduplicated by idempotency key
+        self.side_effect = side_effect
+        self.timeout = timeout
+        # Handler keyword arguments filled from the call's state (e.g. hold_key), never from the model
+        self.context = tuple(context)
+        self.schema = {
+            "type": "function",
+            "name": self.name,
+            "description": self.description,
+            "parameters": _object_schema(self.params),
+        }
+
+    def validate(self, arguments):
+        """Return the handler's keyword arguments, coerced, or raise ToolArgumentError."""
+        return _validate_object(self.params, arguments, f"arguments for {self.name}")
+
+
+class ToolRegistry:
+    """Name -> Tool lookup, the single dispatch table for the realtime agent."""
+
+    def __init__(self, tools):
+        self._tools = {}
+        for tool in tools:
+            if tool.name in self._tools:
+                raise ValueError(f"Tool '{tool.name}' is registered twice.")
+            self._tools[tool.name] = tool
+
+    def get(self, name):
+        return self._tools.get(name)
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def schemas(self, names):
+        """Schemas for the given tool names, in that order."""
+        return [self._tools[name].schema for name in names]